@@ -27,6 +27,10 @@ def create_app():
     db.init_app(app)
     login_manager.init_app(app)
 
+    # tablas del bind local (SQLite): usuarios offline y cubo del dashboard
+    with app.app_context():
+        db.create_all(bind_key="local")
+
     # comprobar conexión al SQL Server
     if can_connect_sqlserver("190.255.33.10", 2500):
         print("🔗 Conectado a SQL Server")
@@ -9,6 +9,12 @@ import pandas as pd
 from io import BytesIO
 from openpyxl.utils import get_column_letter
 from tempfile import NamedTemporaryFile
+import os
+from .auth import admin_required_api
+from . import procedimientos, liquidacion, exportar, trabajos
+from .busqueda_empleados import indice_empleados
+from .catalogo_destajos import catalogo_destajos
+from . import sync_catalogos, condicional, sync_registros, consulta_registros
 
 api_bp = Blueprint("api", __name__)
 
@@ -18,39 +24,11 @@ def employees():
     q = request.args.get("q", "").strip()
     planta = request.args.get("planta", "").strip()
 
-    where = ["estado = 'ACTIVO'"]
-    params = {}
-
-    if q:
-        where.append("""(
-            LOWER(LTRIM(RTRIM(nombreCompleto))) LIKE LOWER(:q) OR
-            LOWER(LTRIM(RTRIM(apellidoCompleto))) LIKE LOWER(:q) OR
-            LOWER(LTRIM(RTRIM(nombreCompleto)) + ' ' + LTRIM(RTRIM(apellidoCompleto))) LIKE LOWER(:q) OR
-            CAST(numeroDocumento AS NVARCHAR(50)) LIKE :q
-        )""")
-        params['q'] = f'%{q}%'
-
-    # si planta fue enviada y no es vacío ni 'TODAS', filtramos por agrupador4
-    if planta and planta.upper() != 'TODAS':
-        where.append("agrupador4 LIKE :pplanta")
-        params['pplanta'] = f'%{planta}%'
-
-    sql = text(f"""
-        SELECT nombreCompleto, apellidoCompleto, numeroDocumento, agrupador4
-        FROM GH_Empleados
-        WHERE {' AND '.join(where)}
-        ORDER BY nombreCompleto
-    """)
-    rows = db.session.execute(sql, params).mappings().all()
-
-    return jsonify([
-        {
-            'nombre': f"{r['nombreCompleto']} {r['apellidoCompleto']}".strip(),
-            'documento': str(r['numeroDocumento']),
-            'agrupador4': r.get('agrupador4')
-        }
-        for r in rows
-    ])
+    # índice en memoria (trigramas, sin tildes); se recarga cuando cambia GH_Empleados
+    indice_empleados.asegurar()
+    return condicional.respuesta_json("employees", indice_empleados.generacion,
+                                      lambda: indice_empleados.buscar(q, planta), q, planta,
+                                      cache=condicional.consultas)
 
 
 @api_bp.get("/destajos")
@@ -58,37 +36,22 @@ def employees():
 def destajos_catalog():
     q = request.args.get("q", "").strip()
     planta = request.args.get("planta", "").strip()
-    where = ["1=1"]
-    params = {}
-
-    if q:
-        where.append("Concepto LIKE :q")
-        params['q'] = f'%{q}%'
-
-    # Si planta no se envía o es vacío → no filtrar 
-    # Si planta == 'TODAS' → incluir todos
-    if planta and planta.upper() != 'TODAS':
-        # traemos filas donde GH_Destajos.Planta = planta OR Planta = 'TODAS'
-        where.append("(Planta = :planta OR Planta = 'TODAS')")
-        params['planta'] = planta
-
-    sql = text(f"""
-        SELECT Id, Planta, Concepto, Valor
-        FROM GH_Destajos
-        WHERE {' AND '.join(where)}
-        ORDER BY Concepto
-    """)
-    rows = db.session.execute(sql, params).mappings().all()
-
-    return jsonify([
-        {
-            'id': int(r['Id']),
-            'planta': r['Planta'],
-            'concepto': r['Concepto'],
-            'valor': float(r['Valor'] or 0)
-        }
-        for r in rows
-    ])
+
+    # catálogo en memoria por planta (sus destajos + 'TODAS'); sin planta o 'TODAS' → todos
+    def generar():
+        return [
+            {
+                'id': int(d['Id']),
+                'planta': d['Planta'],
+                'concepto': d['Concepto'],
+                'valor': float(d['Valor'] or 0)
+            }
+            for d in catalogo_destajos.buscar(q, planta)
+        ]
+
+    catalogo_destajos.asegurar()
+    return condicional.respuesta_json("destajos", catalogo_destajos.generacion, generar, q, planta,
+                                      cache=condicional.consultas)
 
 @api_bp.post("/registros")
 @login_required
@@ -103,6 +66,7 @@ def crear_registro():
         usuario_id=current_user.id
     )
     db.session.add(reg)
+    condicional.tocar("registros_destajo")
     db.session.commit()
     return jsonify({'ok': True, 'id': reg.id})
 
@@ -129,6 +93,7 @@ def editar_registro(rid):
     if 'fecha' in data:
         reg.fecha = datetime.fromisoformat(data['fecha']).date()
 
+    condicional.tocar("registros_destajo")
     db.session.commit()
     return jsonify({'ok': True})
 
@@ -138,6 +103,7 @@ def eliminar_registro(rid):
     reg = db.session.get(RegistroDestajo, rid)
     if not reg: return jsonify({'error':'not found'}), 404
     db.session.delete(reg)
+    condicional.tocar("registros_destajo")
     db.session.commit()
     return jsonify({'ok': True})
 
@@ -151,75 +117,100 @@ def safe_iso(value):
 @api_bp.get("/registros")
 @login_required
 def listar_registros():
+    """
+    Sin `limite`: lista completa (compatibilidad). Con `limite` (vacío = REGISTROS_PAGINA): una página por keyset
+    sobre (fecha, id) → {items, siguiente}; la siguiente se pide con `cursor=<siguiente>`.
+    `modo=resumen` devuelve solo totales; `campos=ligero` omite usuario y textos del destajo.
+    """
     doc = request.args.get('documento')
     f1 = request.args.get('desde')
     f2 = request.args.get('hasta')
     planta = request.args.get('planta')  # 👈 nuevo
-
-    sql = """
-        SELECT r.id, r.empleado_documento, r.empleado_nombre, r.destajo_id, r.cantidad,
-               r.fecha, r.fecha_registro, r.usuario_id, d.Concepto, u.name
-        FROM registros_destajo r
-        INNER JOIN GH_Destajos d ON d.Id = r.destajo_id INNER JOIN users u on r.usuario_id = u.id
-        WHERE 1=1
-    """
-    params = {}
-    if doc:
-        sql += " AND r.empleado_documento = :doc"
-        params['doc'] = doc
-    if f1:
-        sql += " AND r.fecha >= :f1"
-        params['f1'] = date.fromisoformat(f1)
-    if f2:
-        sql += " AND r.fecha <= :f2"
-        params['f2'] = date.fromisoformat(f2)
-    if planta:  # 👈 nuevo filtro
-        sql += " AND d.Planta = :planta"
-        params['planta'] = planta
-
-    sql += " ORDER BY r.fecha DESC"
-    rows = db.session.execute(text(sql), params).mappings().all()
-
-    return jsonify([{
-        'id': int(r['id']),
-        'empleado_documento': r['empleado_documento'],
-        'empleado_nombre': r['empleado_nombre'],
-        'destajo_id': int(r['destajo_id']),
-        'destajo': r['Concepto'],
-        'cantidad': float(r['cantidad']),
-        'fecha': safe_iso(r['fecha']),
-        'fecha_registro': safe_iso(r['fecha_registro']),
-        'usuario_id': int(r['usuario_id']),
-        'usuario_nombre' : r['name']
-    } for r in rows])
+    modo = request.args.get('modo', '')
+    ligero = request.args.get('campos') == 'ligero'
+    cursor = request.args.get('cursor') or None
+    limite = None
+    if 'limite' in request.args:
+        limite = request.args.get('limite', type=int) or current_app.config['REGISTROS_PAGINA']
+        limite = max(1, min(limite, current_app.config['REGISTROS_PAGINA_MAX']))
+    try:
+        if cursor:
+            consulta_registros.leer_cursor(cursor)
+        for f in (f1, f2):
+            if f:
+                date.fromisoformat(f)
+    except ValueError:
+        return jsonify({'error': 'Fecha o cursor inválido'}), 400
+
+    def fila(r):
+        out = {
+            'id': int(r['id']),
+            'empleado_documento': r['empleado_documento'],
+            'empleado_nombre': r['empleado_nombre'],
+            'destajo_id': int(r['destajo_id']),
+            'cantidad': float(r['cantidad']),
+            'fecha': safe_iso(r['fecha']),
+            'usuario_id': int(r['usuario_id']),
+        }
+        if not ligero:
+            out.update({
+                'destajo': r['Concepto'],
+                'fecha_registro': safe_iso(r['fecha_registro']),
+                'usuario_nombre' : r['name']
+            })
+        return out
+
+    def generar():
+        if modo == 'resumen':
+            t = consulta_registros.resumen(doc, f1, f2, planta)
+            return {
+                'total': int(t['total'] or 0),
+                'cantidad': float(t['cantidad'] or 0),
+                'empleados': int(t['empleados'] or 0),
+                'desde': safe_iso(t['desde']),
+                'hasta': safe_iso(t['hasta']),
+            }
+        filas, siguiente = consulta_registros.listar(doc, f1, f2, planta, limite, cursor, ligero)
+        items = [fila(r) for r in filas]
+        if limite is None:
+            return items
+        return {'items': items, 'siguiente': siguiente}
+
+    # la versión cambia con cada escritura de registros (o del catálogo de destajos, por el Concepto)
+    version, actualizado = condicional.version_tabla("registros_destajo")
+    catalogo_destajos.asegurar()
+    version = (version, catalogo_destajos.generacion)
+    return condicional.respuesta_json("registros", version, generar, doc, f1, f2, planta,
+                                      modo, ligero, limite, cursor, modificado=actualizado,
+                                      cache=condicional.consultas)
 
 @api_bp.post("/sync")
 @login_required
 def sync_batch():
     items = request.get_json(force=True)
-    created = []
-    for i in items:
-        reg = RegistroDestajo(
-            empleado_documento=i['empleado_documento'],
-            empleado_nombre=i['empleado_nombre'],
-            destajo_id = int(i['destajo_id']) if i.get('destajo_id') else -1,
-            cantidad=float(i['cantidad']),
-            fecha=datetime.fromisoformat(i['fecha']).date(),
-            usuario_id=current_user.id
-        )
-        db.session.add(reg)
-        db.session.flush()
-        created.append(reg.id)
-    db.session.commit()
-    return jsonify({'ok': True, 'ids': created})
-
-# GET /api/empleados
+    if not isinstance(items, list):
+        return jsonify({'ok': False, 'error': 'Se esperaba una lista de registros'}), 400
+
+    # inserción en bloque e idempotente por `clave` (ver sync_registros)
+    resultados = sync_registros.ingresar(items, current_user.id)
+    return jsonify({
+        'ok': all(r['estado'] != 'error' for r in resultados),
+        'ids': [r['id'] for r in resultados if r['estado'] == 'creado'],
+        'resultados': resultados,
+    })
+
+# GET /api/empleados            -> lista completa
+# GET /api/empleados?version=... -> solo cambios desde esa versión (ver sync_catalogos)
 @api_bp.route("/empleados", methods=["GET"])
 def get_empleados():
     try:
-        empleados = GHEmpleado.query.all()
-        empleados_data = [e.to_dict() for e in empleados]  # asegúrate que el modelo tenga to_dict()
-        return jsonify(empleados_data), 200
+        # mismo estado que el sync por diferencias: sin consultar ni serializar de nuevo si no cambió
+        cat = sync_catalogos.empleados
+        version, filas, _ = cat.estado()
+        if 'version' in request.args:
+            vc = request.args['version']
+            return condicional.respuesta_json("empleados", version, lambda: cat.delta(vc), vc)
+        return condicional.respuesta_json("empleados", version, lambda: list(filas.values()))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -229,16 +220,15 @@ def get_destajos():
     try:
         planta = request.args.get('planta', '').strip()
         q = request.args.get('q', '').strip()
-
-        query = GHDestajo.query
-        if q:
-            query = query.filter(GHDestajo.Concepto.ilike(f'%{q}%'))
-        if planta and planta.upper() != 'TODAS':
-            query = query.filter((GHDestajo.Planta == planta) | (GHDestajo.Planta == 'TODAS'))
-
-        destajos = query.order_by(GHDestajo.Concepto).all()
-        destajos_data = [d.to_dict() for d in destajos]
-        return jsonify(destajos_data), 200
+        if 'version' in request.args and not planta and not q:
+            cat = sync_catalogos.destajos
+            vc = request.args['version']
+            return condicional.respuesta_json("mdestajos", cat.estado()[0], lambda: cat.delta(vc), vc)
+
+        catalogo_destajos.asegurar()
+        return condicional.respuesta_json("mdestajos", catalogo_destajos.generacion,
+                                          lambda: catalogo_destajos.buscar(q, planta), q, planta,
+                                          cache=condicional.consultas if q or planta else None)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -257,139 +247,74 @@ def liquidacion_excel():
     f1 = request.args.get('desde')
     f2 = request.args.get('hasta')
 
-    params = {}
-    sql = """
-    SELECT
-        CASE 
-            WHEN LEFT(e.tipoIdentificacion,11)='Cédula Ciud' THEN 'C'
-            WHEN LEFT(e.tipoIdentificacion,11)='Cédula de E' THEN 'E'
-            WHEN LEFT(e.tipoIdentificacion,11)='Permiso Por' THEN 'PT'
-            ELSE e.tipoIdentificacion 
-        END AS TipoDocumento,
-        r.empleado_documento AS NumeroDocumento,
-        d.Concepto,
-        ee.centroCosto AS AreaFuncional,
-        r.cantidad AS Cantidad,
-        ISNULL(d.Valor,0) AS Valor
-    FROM registros_destajo r
-    JOIN GH_Empleados e 
-        ON e.numeroDocumento = r.empleado_documento
-    JOIN GH_Destajos d 
-        ON d.Id = r.destajo_id
-    OUTER APPLY (
-        SELECT TOP 1 ee.centroCosto
-        FROM GH_Empleados ee
-        WHERE ee.Agrupador4 = d.Planta
-    ) ee
-    WHERE 1=1
+    df = liquidacion.consultar_registros(doc, f1, f2)
+    SMV = current_app.config.get('AAA', liquidacion.SMV_DEFECTO)
+    df_out = liquidacion.calcular(df, smv=SMV, fecha_novedad=f2 if f2 else "")
+
+    # --- Layout fijo sin encabezado: xlsx write-only enviado por trozos, o ?formato=csv|txt ---
+    return exportar.respuesta(df_out, "liquidacion", request.args.get("formato", "xlsx"),
+                              encabezado=False, hoja="Liquidacion")
+
+@api_bp.post("/liquidacion/excel/trabajo")
+@login_required
+def liquidacion_excel_trabajo():
+    """
+    Igual que /liquidacion/excel pero en segundo plano: devuelve el id del trabajo
+    para consultar su estado en /exportaciones/<id>.
     """
+    doc = request.args.get('documento')
+    f1 = request.args.get('desde')
+    f2 = request.args.get('hasta')
+    SMV = current_app.config.get('AAA', liquidacion.SMV_DEFECTO)
 
-    if f1:
-        sql += " AND r.fecha >= :f1"
-        params['f1'] = date.fromisoformat(f1)
-    if f2:
-        sql += " AND r.fecha <= :f2"
-        params['f2'] = date.fromisoformat(f2)
-    if doc:
-        sql += " AND r.empleado_documento = :doc"
-        params['doc'] = doc
-
-    rows = db.session.execute(text(sql), params).mappings().all()
-    df = pd.DataFrame(rows)
-
-    cols = [
-        "TipoRegistro","TipoDocumento","NumeroDocumento","Concepto","TipoNovedad","TipoReporte",
-        "ValorTotal","IncluyePago","SumaResta","FechaInicial","CantidadDias",
-        "TipoIncapacidad","Diagnostico","NumeroIncapacidad","FechaRetiro","MotivoRetiro",
-        "AreaFuncional","RangoDiaInicial","RangoHoraInicial","RangoHoraFinal","NumeroDias",
-        "Cantidad","NumeroHoras","Indemnizacion","FechaNovedad","PagoTotal",
-        "NaturalezaIncapacidad","FechaInicialEPS","Proyecto","FechaRetiroReal","Gobierno1","Gobierno2",
-        "FechaIniIncPro","TipoDocEntidad","NumDocEntidad","TipoServicioEntidad",
-        "IncapacidadDiasHab","Observaciones","Docentes"
-    ]
-
-    if df.empty:
-        df_out = pd.DataFrame(columns=cols)
-    else:
-        df['Cantidad'] = pd.to_numeric(df['Cantidad'], errors='coerce').fillna(0)
-        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
-
-        SMV = current_app.config.get('AAA', 47450)
-
-        df_group = df.groupby(
-            ['TipoDocumento','NumeroDocumento','Concepto','AreaFuncional'],
-            as_index=False
-        ).agg({'Cantidad':'sum','Valor':'mean'})
-
-        df_validos = df[~df['Concepto'].str.contains('DESCANSO|JORNAL', case=False, regex=True)].copy()
-        df_validos['vxq'] = df_validos['Valor']*df_validos['Cantidad']
-        ponderado = df_validos.groupby('NumeroDocumento').agg(
-            total_val=('vxq','sum'), conteo=('vxq','count')
-        )
-        ponderado['PromPond'] = ponderado['total_val']/ponderado['conteo']
-        ponderado['PromPond'] = ponderado['PromPond'].apply(lambda x: max(x,SMV))
-        prom_map = ponderado['PromPond'].to_dict()
-
-        def calc_valor_total(row):
-            concepto = (row.get('Concepto') or '').upper()
-            qty = float(row.get('Cantidad',0))
-            numdoc = row.get('NumeroDocumento')
-            if 'JORNAL FESTIVO' in concepto:
-                return SMV * 1.8 * qty
-            if 'JORNAL' in concepto:
-                return SMV * qty
-            if 'DESCANSO' in concepto:
-                prom = prom_map.get(numdoc, SMV)
-                return prom * qty
-            return ""
-
-        df_group['ValorTotal'] = df_group.apply(calc_valor_total, axis=1)
-        df_group['TipoNovedad'] = df_group['Concepto'].str.contains(
-            'DESCANSO|JORNAL', case=False, regex=True).map(lambda x: 4 if x else 3)
-        df_group['TipoRegistro'] = 1
-        df_group['TipoReporte'] = 5
-        df_group['FechaNovedad'] = f2 if f2 else ""
-        df_group['IncluyePago'] = df_group['TipoNovedad'].apply(lambda x: 'Y' if x == 4 else '')
-        df_group['SumaResta']   = df_group['TipoNovedad'].apply(lambda x: 1 if x == 4 else '')
-
-        for c in ["FechaInicial","CantidadDias","TipoIncapacidad","Diagnostico","NumeroIncapacidad",
-                  "FechaRetiro","MotivoRetiro","RangoDiaInicial","RangoHoraInicial","RangoHoraFinal",
-                  "NumeroDias","NumeroHoras","Indemnizacion","PagoTotal","NaturalezaIncapacidad",
-                  "FechaInicialEPS","Proyecto","FechaRetiroReal","Gobierno1","Gobierno2",
-                  "FechaIniIncPro","TipoDocEntidad","NumDocEntidad","TipoServicioEntidad",
-                  "IncapacidadDiasHab","Observaciones","Docentes"]:
-            df_group[c] = ""
-
-        # Redondear a 2 decimales las columnas numéricas
-        df_group['ValorTotal'] = pd.to_numeric(df_group['ValorTotal'], errors='coerce').round(2)
-        df_group['Cantidad']   = pd.to_numeric(df_group['Cantidad'], errors='coerce').round(2)
-        df_group['Valor']      = pd.to_numeric(df_group['Valor'], errors='coerce').round(2)
-
-        df_out = df_group[cols]
-
-    # --- Guardar en memoria como .xlsx ---
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_out.to_excel(writer, index=False, header=False, sheet_name="Liquidacion")
-    output.seek(0)
-
-    return send_file(
-        output,
-        download_name="liquidacion.xlsx",
-        as_attachment=True,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    def generar():
+        df = liquidacion.consultar_registros(doc, f1, f2)
+        return liquidacion.calcular(df, smv=SMV, fecha_novedad=f2 if f2 else "")
+
+    t = trabajos.encolar(current_app._get_current_object(), "liquidacion", generar, "liquidacion",
+                         usuario_id=current_user.id, formato=request.args.get("formato", "xlsx"),
+                         encabezado=False, hoja="Liquidacion")
+    return jsonify(t.to_dict()), 202
+
+@api_bp.get("/exportaciones/<trabajo_id>")
+@login_required
+def estado_exportacion(trabajo_id):
+    t = trabajos.obtener(trabajo_id, current_user)
+    if t is None:
+        return jsonify({"error": "Exportación no encontrada o vencida"}), 404
+    return jsonify(t.to_dict())
+
+@api_bp.get("/exportaciones/<trabajo_id>/archivo")
+@login_required
+def descargar_exportacion(trabajo_id):
+    t = trabajos.obtener(trabajo_id, current_user)
+    if t is None or t.estado != "listo" or not t.ruta or not os.path.exists(t.ruta):
+        return jsonify({"error": "Archivo no disponible"}), 404
+    return send_file(t.ruta, download_name=t.nombre_archivo, as_attachment=True, mimetype=t.mimetype)
 
 @api_bp.get("/plantas")
 @login_required
 def plantas():
-    sql = text("""
-        SELECT DISTINCT Planta
-        FROM GH_Plantas
-        WHERE Planta IS NOT NULL AND LTRIM(RTRIM(Planta)) <> ''
-        ORDER BY Planta
-    """)
-    rows = db.session.execute(sql).mappings().all()
+    cat = sync_catalogos.plantas
+    version, filas, _ = cat.estado()
+    if 'version' in request.args:
+        vc = request.args['version']
+        return condicional.respuesta_json("plantas", version, lambda: cat.delta(vc), vc)
     # devolver lista simple de objetos { Planta: '...' } para facilitar sync en IndexedDB
-    return jsonify([{'Planta': r['Planta']} for r in rows])
+    return condicional.respuesta_json("plantas", version, lambda: list(filas.values()))
 
+@api_bp.get("/cache/sp")
+@login_required
+@admin_required_api
+def cache_sp():
+    # hits/misses de la cache compartida de stored procedures (monitoreo)
+    return jsonify(procedimientos.estadisticas())
+
+@api_bp.post("/cache/destajos/invalidar")
+@login_required
+@admin_required_api
+def invalidar_destajos():
+    # recarga el catálogo de destajos en todos los workers (cambios hechos directo en GH_Destajos)
+    catalogo_destajos.invalidar()
+    catalogo_destajos.asegurar()
+    return jsonify({'ok': True, 'conceptos': len(catalogo_destajos.todos())})
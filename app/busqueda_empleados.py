@@ -0,0 +1,153 @@
+# app/busqueda_empleados.py
+import logging
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from sqlalchemy import text
+from .extensions import db
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SQL_EMPLEADOS = """
+    SELECT nombreCompleto, apellidoCompleto, numeroDocumento, agrupador4
+    FROM GH_Empleados
+    WHERE estado = 'ACTIVO'
+    ORDER BY nombreCompleto
+"""
+
+# Cambia cuando se inserta, borra o modifica un empleado (barato: sin traer filas)
+SQL_TOKEN = """
+    SELECT COUNT(*) AS n,
+           CHECKSUM_AGG(BINARY_CHECKSUM(numeroDocumento, nombreCompleto, apellidoCompleto, estado, agrupador4)) AS chk
+    FROM GH_Empleados
+"""
+
+
+def plegar(texto):
+    """
+    Minúsculas y sin tildes (á→a, ñ→n) para comparar como lo haría una persona.
+    """
+    if texto is None:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceEmpleados:
+    """
+    Índice en memoria de los empleados activos para el typeahead de destajos.
+
+    Cada empleado se busca por "nombre apellido" y por documento (subcadena, sin tildes
+    ni mayúsculas). Las consultas de 3+ caracteres intersectan listas de trigramas y
+    verifican los candidatos; las más cortas recorren la lista completa.
+    Se recarga cuando cambia el token de GH_Empleados (revisado cada EMPLEADOS_TOKEN_SEG)
+    o, si el token no se puede leer, cada EMPLEADOS_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recargando = threading.Lock()
+        self._empleados = []       # dicts de salida, en el orden de SQL_EMPLEADOS
+        self._textos = []          # "nombre apellido\0documento" plegado
+        self._plantas = []         # agrupador4 plegado
+        self._postings = {}        # trigrama -> set de posiciones
+        self._token = None
+        self.generacion = 0        # sube en cada recarga (versión para los ETag de /employees)
+        self._cargado = 0.0
+        self._revisado = 0.0
+
+    def _leer_token(self):
+        try:
+            r = db.session.execute(text(SQL_TOKEN)).mappings().first()
+            return (r["n"], r["chk"])
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"No se pudo leer el token de GH_Empleados: {e}")
+            return None
+
+    def _construir(self, token):
+        rows = db.session.execute(text(SQL_EMPLEADOS)).mappings().all()
+        empleados, textos, plantas = [], [], []
+        postings = defaultdict(set)
+        for i, r in enumerate(rows):
+            empleados.append({
+                'nombre': f"{r['nombreCompleto']} {r['apellidoCompleto']}".strip(),
+                'documento': str(r['numeroDocumento']),
+                'agrupador4': r.get('agrupador4')
+            })
+            nombre = f"{(r['nombreCompleto'] or '').strip()} {(r['apellidoCompleto'] or '').strip()}"
+            texto = f"{plegar(nombre)}\0{plegar(r['numeroDocumento'])}"
+            textos.append(texto)
+            plantas.append(plegar(r.get('agrupador4')))
+            for t in trigramas(texto):
+                postings[t].add(i)
+
+        ahora = time.monotonic()
+        with self._lock:
+            self._empleados, self._textos, self._plantas = empleados, textos, plantas
+            self._postings = dict(postings)
+            self._token, self._cargado, self._revisado = token, ahora, ahora
+            self.generacion += 1
+        logger.info(f"Índice de empleados: {len(empleados)} activos")
+
+    def _revisar(self):
+        """
+        Devuelve (vigente, token). El token se consulta como máximo cada EMPLEADOS_TOKEN_SEG.
+        """
+        ahora = time.monotonic()
+        if self._cargado and ahora - self._revisado < Config.EMPLEADOS_TOKEN_SEG:
+            return True, self._token
+        token = self._leer_token()
+        self._revisado = ahora
+        if not self._cargado:
+            return False, token
+        if token is None:
+            # sin token (p. ej. SQL Server no disponible para CHECKSUM_AGG): solo por TTL
+            return ahora - self._cargado < Config.EMPLEADOS_TTL, token
+        return token == self._token, token
+
+    def asegurar(self):
+        """
+        Recarga el índice si cambió GH_Empleados. Mientras un hilo recarga, los demás
+        siguen respondiendo con el índice anterior.
+        """
+        if self._recargando.locked() and self._cargado:
+            return
+        with self._recargando:
+            vigente, token = self._revisar()
+            if not vigente:
+                self._construir(token)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado = 0.0
+
+    def buscar(self, q="", planta=""):
+        self.asegurar()
+        with self._lock:
+            empleados, textos, plantas, postings = self._empleados, self._textos, self._plantas, self._postings
+
+        qf = plegar(q.strip())
+        if len(qf) >= 3:
+            grams = sorted((postings.get(t, set()) for t in trigramas(qf)), key=len)
+            candidatos = set.intersection(*grams) if grams else set()
+            pos = sorted(i for i in candidatos if qf in textos[i])
+        elif qf:
+            pos = [i for i, t in enumerate(textos) if qf in t]
+        else:
+            pos = range(len(empleados))
+
+        pf = plegar(planta.strip())
+        if pf and pf != "todas":
+            pos = [i for i in pos if pf in plantas[i]]
+
+        return [empleados[i] for i in pos]
+
+
+indice_empleados = IndiceEmpleados()
@@ -0,0 +1,84 @@
+# app/cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(*partes):
+    """
+    Genera una clave corta y estable a partir de parámetros serializables a JSON.
+    """
+    raw = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+class LRUCache:
+    """
+    Cache en memoria del proceso con expulsión LRU (thread-safe).
+    `ttl` (segundos) es la vigencia por defecto de cada entrada; None = sin vencimiento.
+    """
+
+    def __init__(self, maxsize=16, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expira = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expira)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, loader, ttl=None):
+        """
+        Devuelve el valor cacheado o lo calcula con `loader()` y lo guarda.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl=ttl)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,141 @@
+# app/catalogo_destajos.py
+import logging
+import threading
+import time
+from sqlalchemy import text
+from .extensions import db
+from .models import GHDestajo
+from .busqueda_empleados import plegar
+from . import condicional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Cambia cuando se inserta, borra o modifica un destajo (barato: sin traer filas)
+SQL_TOKEN = """
+    SELECT COUNT(*) AS n,
+           CHECKSUM_AGG(BINARY_CHECKSUM(Id, Planta, Concepto, Valor)) AS chk
+    FROM GH_Destajos
+"""
+
+
+class CatalogoDestajos:
+    """
+    GH_Destajos en memoria, con la lista ya filtrada y ordenada por Concepto para cada planta
+    (sus destajos + los de 'TODAS'), como lo hacían las consultas de /destajos y /mdestajos.
+    `q` se busca como subcadena del concepto sin tildes ni mayúsculas.
+
+    Se recarga cuando:
+      - cambia el token de GH_Destajos (revisado cada DESTAJOS_TOKEN_SEG; sin token, cada DESTAJOS_TTL), o
+      - un admin lo invalida (versión en versiones_tabla, compartida entre workers).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recargando = threading.Lock()
+        self._filas = []           # to_dict() en orden de Concepto
+        self._textos = []          # concepto plegado
+        self._por_planta = {}      # planta plegada -> posiciones (incluye las de 'TODAS')
+        self._comunes = []         # posiciones de Planta = 'TODAS'
+        self._token = None
+        self._version_local = None
+        self.generacion = 0        # sube en cada recarga (versión para los ETag)
+        self._cargado = 0.0
+        self._revisado = 0.0
+
+    def _leer_token(self):
+        try:
+            r = db.session.execute(text(SQL_TOKEN)).mappings().first()
+            return (r["n"], r["chk"])
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"No se pudo leer el token de GH_Destajos: {e}")
+            return None
+
+    def _construir(self, token, version_local):
+        filas = [d.to_dict() for d in GHDestajo.query.order_by(GHDestajo.Concepto).all()]
+        textos = [plegar(f["Concepto"]) for f in filas]
+
+        plantas = {}
+        comunes = []
+        for i, f in enumerate(filas):
+            p = plegar(f["Planta"]).strip()
+            if p == "todas":
+                comunes.append(i)
+            else:
+                plantas.setdefault(p, []).append(i)
+        por_planta = {p: sorted(pos + comunes) for p, pos in plantas.items()}
+
+        with self._lock:
+            self._filas, self._textos = filas, textos
+            self._por_planta, self._comunes = por_planta, comunes
+            self._token, self._version_local = token, version_local
+            self._cargado = self._revisado = time.monotonic()
+            self.generacion += 1
+        logger.info(f"Catálogo de destajos: {len(filas)} conceptos, {len(por_planta)} plantas")
+
+    def _revisar(self):
+        """
+        Devuelve (vigente, token, version_local). La versión local (SQLite) se mira siempre;
+        el token de SQL Server como máximo cada DESTAJOS_TOKEN_SEG.
+        """
+        version_local = condicional.version_tabla("GH_Destajos")[0]
+        if not self._cargado:
+            return False, self._leer_token(), version_local
+        if version_local != self._version_local:
+            return False, self._leer_token(), version_local
+
+        ahora = time.monotonic()
+        if ahora - self._revisado < Config.DESTAJOS_TOKEN_SEG:
+            return True, self._token, version_local
+        token = self._leer_token()
+        self._revisado = ahora
+        if token is None:
+            return ahora - self._cargado < Config.DESTAJOS_TTL, token, version_local
+        return token == self._token, token, version_local
+
+    def asegurar(self):
+        """
+        Recarga el catálogo si cambió. Mientras un hilo recarga, los demás siguen
+        respondiendo con el catálogo anterior.
+        """
+        if self._recargando.locked() and self._cargado:
+            return
+        with self._recargando:
+            vigente, token, version_local = self._revisar()
+            if not vigente:
+                self._construir(token, version_local)
+
+    def invalidar(self):
+        """
+        Fuerza la recarga en todos los workers (p. ej. después de editar GH_Destajos a mano).
+        """
+        condicional.tocar("GH_Destajos")
+        db.session.commit()
+        with self._lock:
+            self._cargado = 0.0
+
+    def buscar(self, q="", planta=""):
+        """
+        Destajos de `planta` (vacía o 'TODAS' = todos) cuyo concepto contiene `q`, como to_dict().
+        """
+        self.asegurar()
+        with self._lock:
+            filas, textos, por_planta, comunes = self._filas, self._textos, self._por_planta, self._comunes
+
+        pf = plegar(planta).strip()
+        if not pf or pf == "todas":
+            pos = range(len(filas))
+        else:
+            pos = por_planta.get(pf, comunes)
+
+        qf = plegar(q.strip())
+        if qf:
+            pos = [i for i in pos if qf in textos[i]]
+        return [filas[i] for i in pos]
+
+    def todos(self):
+        return self.buscar()
+
+
+catalogo_destajos = CatalogoDestajos()
@@ -0,0 +1,104 @@
+# app/condicional.py
+import hashlib
+import logging
+from datetime import datetime, timezone
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from .cache import LRUCache, cache_key
+from .extensions import db
+from .models import VersionTabla
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Cuerpos JSON ya serializados por (endpoint, versión de los datos, parámetros).
+# Catálogos completos y deltas (pocos, grandes) van aparte de las consultas por parámetros
+# (typeahead por `q`, páginas por cursor) para que estas no expulsen a los primeros.
+catalogos = LRUCache(maxsize=Config.CONDICIONAL_CACHE_MAX, ttl=Config.CONDICIONAL_TTL)
+consultas = LRUCache(maxsize=Config.CONDICIONAL_CONSULTAS_MAX, ttl=Config.CONDICIONAL_TTL)
+
+
+def version_tabla(tabla):
+    """
+    (version, actualizado) de una tabla según las escrituras hechas desde la app.
+    """
+    v = db.session.get(VersionTabla, tabla)
+    return (v.version, v.actualizado) if v else (0, None)
+
+
+def tocar(tabla):
+    """
+    Marca `tabla` como modificada cuando la escritura que la llama se confirme.
+
+    VersionTabla vive en SQLite y la escritura en SQL Server: un mismo commit no es atómico
+    entre las dos bases. Por eso la versión se sube solo después de que el commit de la
+    sesión termina bien (y se descarta si hace rollback): nunca se anuncia un cambio que no
+    quedó guardado. Si lo que falla es subir la versión, se registra el error y se vacían
+    las caches de este proceso; los demás workers lo recogen al vencer CONDICIONAL_TTL.
+    """
+    db.session.info.setdefault("tablas_tocadas", set()).add(tabla)
+
+
+def _subir_versiones(tablas):
+    ahora = datetime.utcnow()
+    t = VersionTabla.__table__
+    stmt = insert(t).values(tabla=tablas[0], version=1, actualizado=ahora)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.tabla],
+        set_={"version": t.c.version + 1, "actualizado": ahora})
+    with db.engines["local"].begin() as conn:
+        for tabla in tablas:
+            conn.execute(stmt.values(tabla=tabla))
+
+
+@event.listens_for(Session, "after_commit")
+def _confirmar_tocadas(session):
+    tablas = session.info.pop("tablas_tocadas", None)
+    if not tablas:
+        return
+    try:
+        _subir_versiones(sorted(tablas))
+    except Exception as e:
+        logger.error(f"No se pudo subir la versión de {sorted(tablas)}: {e}")
+        catalogos.clear()
+        consultas.clear()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_tocadas(session, previous_transaction):
+    session.info.pop("tablas_tocadas", None)
+
+
+def respuesta_json(nombre, version, generar, *partes, modificado=None, cache=None):
+    """
+    Respuesta JSON con ETag (hash del contenido) y Last-Modified; contesta 304 si el
+    cliente envía If-None-Match / If-Modified-Since vigentes.
+
+    El cuerpo se serializa una sola vez por (nombre, version, partes): mientras la versión
+    de los datos no cambie, `generar()` no se vuelve a llamar. Las entradas vencen a los
+    CONDICIONAL_TTL segundos para recoger cambios hechos fuera de la app.
+    `cache`: `catalogos` (por defecto) o `consultas` para respuestas que dependen de filtros.
+    """
+    cache = catalogos if cache is None else cache
+    key = cache_key(nombre, version, *partes)
+    entrada = cache.get(key)
+    if entrada is None:
+        body = current_app.json.dumps(generar()).encode("utf-8")
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        if modificado is None:
+            modificado = datetime.now(timezone.utc)
+        elif modificado.tzinfo is None:
+            modificado = modificado.replace(tzinfo=timezone.utc)
+        entrada = (etag, modificado.replace(microsecond=0), body)
+        cache.set(key, entrada)
+
+    etag, modificado, body = entrada
+    resp = current_app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.last_modified = modificado
+    # el navegador guarda la copia pero la revalida siempre (datos por usuario)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
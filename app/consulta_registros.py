@@ -0,0 +1,81 @@
+# app/consulta_registros.py
+from datetime import date
+from sqlalchemy import and_, exists, func, or_, select
+from .extensions import db
+from .models import GHDestajo, RegistroDestajo, User
+
+t_reg = RegistroDestajo.__table__
+t_des = GHDestajo.__table__
+t_usr = User.__table__
+
+COLUMNAS_LIGERAS = (t_reg.c.id, t_reg.c.empleado_documento, t_reg.c.empleado_nombre, t_reg.c.destajo_id,
+                    t_reg.c.cantidad, t_reg.c.fecha, t_reg.c.usuario_id)
+COLUMNAS_COMPLETAS = COLUMNAS_LIGERAS + (t_reg.c.fecha_registro, t_des.c.Concepto, t_usr.c.name)
+
+
+def armar_cursor(fila):
+    return f"{fila['fecha'].isoformat()}~{fila['id']}"
+
+
+def leer_cursor(cursor):
+    """
+    "AAAA-MM-DD~id" -> (fecha, id). ValueError si no es válido.
+    """
+    fecha, _, rid = cursor.partition("~")
+    return date.fromisoformat(fecha), int(rid)
+
+
+def _consulta(columnas, doc=None, f1=None, f2=None, planta=None, usuarios=True):
+    # el JOIN con GH_Destajos se mantiene siempre: define qué registros son visibles
+    origen = t_reg.join(t_des, t_des.c.Id == t_reg.c.destajo_id)
+    if usuarios:
+        origen = origen.join(t_usr, t_usr.c.id == t_reg.c.usuario_id)
+    q = select(*columnas).select_from(origen)
+    if not usuarios:
+        # sin traer columnas de users, pero con las mismas filas que el JOIN (usuario existente)
+        q = q.where(exists().where(t_usr.c.id == t_reg.c.usuario_id))
+    if doc:
+        q = q.where(t_reg.c.empleado_documento == doc)
+    if f1:
+        q = q.where(t_reg.c.fecha >= date.fromisoformat(f1))
+    if f2:
+        q = q.where(t_reg.c.fecha <= date.fromisoformat(f2))
+    if planta:
+        q = q.where(t_des.c.Planta == planta)
+    return q
+
+
+def listar(doc=None, f1=None, f2=None, planta=None, limite=None, cursor=None, ligero=False):
+    """
+    Registros ordenados por (fecha, id) descendente. Con `limite` devuelve una página
+    (filas, cursor siguiente o None); `cursor` es el que devolvió la página anterior.
+    `ligero` omite las columnas de users y de texto del destajo (mismas filas que el modo completo).
+    """
+    q = _consulta(COLUMNAS_LIGERAS if ligero else COLUMNAS_COMPLETAS, doc, f1, f2, planta,
+                  usuarios=not ligero)
+    if cursor:
+        cf, ci = leer_cursor(cursor)
+        q = q.where(or_(t_reg.c.fecha < cf, and_(t_reg.c.fecha == cf, t_reg.c.id < ci)))
+    q = q.order_by(t_reg.c.fecha.desc(), t_reg.c.id.desc())
+    if limite is None:
+        return db.session.execute(q).mappings().all(), None
+
+    filas = db.session.execute(q.limit(limite + 1)).mappings().all()
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, armar_cursor(filas[-1])
+    return filas, None
+
+
+def resumen(doc=None, f1=None, f2=None, planta=None):
+    """
+    Totales del filtro sin traer filas: cantidad de registros, suma de cantidades,
+    empleados distintos y rango de fechas.
+    """
+    q = _consulta((func.count().label("total"),
+                   func.sum(t_reg.c.cantidad).label("cantidad"),
+                   func.count(func.distinct(t_reg.c.empleado_documento)).label("empleados"),
+                   func.min(t_reg.c.fecha).label("desde"),
+                   func.max(t_reg.c.fecha).label("hasta")),
+                  doc, f1, f2, planta, usuarios=False)
+    return db.session.execute(q).mappings().first()
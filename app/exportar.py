@@ -0,0 +1,141 @@
+# app/exportar.py
+import csv
+import io
+import os
+from tempfile import NamedTemporaryFile
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# formato -> (extensión, mimetype, separador)
+FORMATOS = {
+    "xlsx": ("xlsx", MIME_XLSX, None),
+    "csv": ("csv", "text/csv", ","),
+    "txt": ("txt", "text/plain", "\t"),
+}
+# Filas que se convierten a la vez al recorrer un DataFrame
+BLOQUE_FILAS = 5000
+# Tamaño de cada trozo al enviar el archivo
+BLOQUE_BYTES = 64 * 1024
+
+
+def filas_df(df, bloque=BLOQUE_FILAS, progreso=None):
+    """
+    Recorre `df` por bloques como tuplas, con NaN/NaT convertidos a None.
+    `progreso(filas_listas, total)` se llama después de cada bloque.
+    """
+    for i in range(0, len(df), bloque):
+        trozo = df.iloc[i:i + bloque]
+        trozo = trozo.astype(object).where(trozo.notna(), None)
+        yield from trozo.itertuples(index=False, name=None)
+        if progreso:
+            progreso(min(i + bloque, len(df)), len(df))
+
+
+def escribir_xlsx(filas, encabezado=None, hoja="Sheet1", ruta=None):
+    """
+    Escribe `filas` (iterable de tuplas) en un .xlsx con openpyxl en modo write-only:
+    las filas se vuelcan a disco a medida que llegan. Devuelve la ruta del archivo.
+    """
+    if ruta is None:
+        with NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+            ruta = tmp.name
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    if encabezado:
+        ws.append(list(encabezado))
+    for fila in filas:
+        ws.append(fila)
+    wb.save(ruta)
+    return ruta
+
+
+def escribir_texto(filas, ruta, encabezado=None, separador=","):
+    """
+    Escribe `filas` como texto delimitado (UTF-8) en `ruta`.
+    """
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=separador, lineterminator="\r\n")
+        if encabezado:
+            writer.writerow(encabezado)
+        for fila in filas:
+            writer.writerow(["" if v is None else v for v in fila])
+    return ruta
+
+
+def escribir(df, ruta, formato="xlsx", encabezado=True, hoja="Sheet1", progreso=None):
+    """
+    Escribe `df` en `ruta` en el formato pedido (ver FORMATOS) sin armar el archivo en memoria.
+    """
+    filas = filas_df(df, progreso=progreso)
+    cols = list(df.columns) if encabezado else None
+    if formato == "xlsx":
+        return escribir_xlsx(filas, cols, hoja, ruta=ruta)
+    return escribir_texto(filas, ruta, cols, FORMATOS[formato][2])
+
+
+def enviar_archivo(ruta, nombre, mimetype, borrar=True):
+    """
+    Envía un archivo ya generado por trozos de BLOQUE_BYTES y lo borra al terminar.
+    """
+    def generar():
+        try:
+            with open(ruta, "rb") as f:
+                while True:
+                    trozo = f.read(BLOQUE_BYTES)
+                    if not trozo:
+                        break
+                    yield trozo
+        finally:
+            if borrar:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+    resp = Response(generar(), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    resp.headers["Content-Length"] = str(os.path.getsize(ruta))
+    return resp
+
+
+def respuesta_xlsx(df, nombre, encabezado=True, hoja="Sheet1"):
+    """
+    DataFrame -> descarga .xlsx (write-only + envío por trozos).
+    """
+    ruta = escribir_xlsx(filas_df(df), list(df.columns) if encabezado else None, hoja)
+    return enviar_archivo(ruta, nombre, MIME_XLSX)
+
+
+def respuesta_csv(df, nombre, encabezado=True, separador=",", mimetype="text/csv"):
+    """
+    DataFrame -> descarga de texto delimitado, generada y enviada por bloques
+    (sin archivo intermedio). Ruta rápida para importar en nómina.
+    """
+    def generar():
+        buf = io.StringIO()
+        writer = csv.writer(buf, delimiter=separador, lineterminator="\r\n")
+        if encabezado:
+            writer.writerow(df.columns)
+        for i, fila in enumerate(filas_df(df), 1):
+            writer.writerow(["" if v is None else v for v in fila])
+            if i % BLOQUE_FILAS == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    resp = Response(stream_with_context(generar()), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return resp
+
+
+def respuesta(df, nombre_base, formato="xlsx", encabezado=True, hoja="Sheet1"):
+    """
+    Descarga de `df` en el formato pedido: xlsx (por defecto), csv o txt (tabulado).
+    """
+    if formato == "csv":
+        return respuesta_csv(df, f"{nombre_base}.csv", encabezado)
+    if formato == "txt":
+        return respuesta_csv(df, f"{nombre_base}.txt", encabezado, separador="\t", mimetype="text/plain")
+    return respuesta_xlsx(df, f"{nombre_base}.xlsx", encabezado, hoja)
@@ -0,0 +1,122 @@
+# app/indice_distintos.py
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .cache import LRUCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceDistintos:
+    """
+    Índice de valores distintos para los filtros (dropdowns) de un reporte.
+
+    Guarda las combinaciones distintas de las columnas filtrables + día del historial
+    completo del SP (una variante por `tipo`), como categóricas. Las consultas filtran
+    en memoria, así que abrir la página ya no depende del tamaño del historial.
+
+    Una variante con más de `refresco` segundos se sigue sirviendo mientras un hilo la
+    recarga (solo cuando alguien la pide: un proceso sin tráfico no consulta nada). Se
+    guardan como máximo FILTROS_VARIANTES_MAX variantes por proceso.
+
+    - `cargar(tipo)`: DataFrame del SP sin más filtros que el tipo.
+    - `columnas`: {parámetro de filtro: columna del SP}.
+    - `salidas`: {clave de la respuesta: columna del SP}.
+    """
+
+    def __init__(self, nombre, cargar, columnas, salidas, refresco=600):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.columnas = columnas
+        self.salidas = salidas
+        self.refresco = refresco
+        # tipo -> (DataFrame de combinaciones, momento de carga)
+        self._variantes = LRUCache(maxsize=Config.FILTROS_VARIANTES_MAX)
+        self._lock = threading.Lock()
+        self._recargando = set()
+        self._app = None
+
+    def _construir(self, tipo):
+        df = self.cargar(tipo)
+        cols = sorted({c for c in list(self.columnas.values()) + list(self.salidas.values()) if c in df.columns})
+        base = df[cols].copy()
+        if "Fecha" in df.columns:
+            base["_dia"] = pd.to_datetime(df["Fecha"], errors="coerce", dayfirst=True).dt.normalize()
+        base = base.drop_duplicates(ignore_index=True)
+        return base.astype({c: "category" for c in cols})
+
+    def _variante(self, tipo):
+        actual = self._variantes.get(tipo)
+        if actual is None:
+            # primera vez que se pide esta variante: se construye en línea
+            actual = (self._construir(tipo), time.monotonic())
+            self._variantes.set(tipo, actual)
+        elif time.monotonic() - actual[1] >= self.refresco:
+            self._recargar_en_fondo(tipo)
+        return actual[0]
+
+    def _recargar_en_fondo(self, tipo):
+        with self._lock:
+            if self._app is None or tipo in self._recargando:
+                return
+            self._recargando.add(tipo)
+        threading.Thread(target=self._recargar, args=(tipo,), daemon=True,
+                         name=f"indice-{self.nombre}").start()
+
+    def _recargar(self, tipo):
+        try:
+            with self._app.app_context():
+                nuevo = self._construir(tipo)
+            self._variantes.set(tipo, (nuevo, time.monotonic()))
+        except Exception as e:
+            logger.error(f"Error refrescando índice {self.nombre} ({tipo}): {e}")
+        finally:
+            with self._lock:
+                self._recargando.discard(tipo)
+
+    def iniciar(self, app):
+        """
+        Registra la app con la que corren las recargas en segundo plano.
+        """
+        self._app = app
+
+    @staticmethod
+    def _mascara_valores(col, valores):
+        # los filtros llegan como strings separados por comas; si la columna es numérica se
+        # comparan como números ("1" debe coincidir con la categoría 1.0)
+        permitidos = [v.strip() for v in str(valores).split(",") if v.strip()]
+        categorias = col.cat.categories
+        if pd.api.types.is_numeric_dtype(categorias.dtype):
+            enc = categorias.isin(pd.to_numeric(pd.Series(permitidos), errors="coerce").dropna())
+        else:
+            enc = categorias.astype(str).isin(permitidos)
+        return np.isin(col.cat.codes.to_numpy(), np.flatnonzero(enc))
+
+    def consultar(self, tipo=None, desde=None, hasta=None, **filtros):
+        """
+        Valores distintos (ordenados) de cada salida para las filas que cumplen los filtros.
+        """
+        df = self._variante(tipo)
+        mask = np.ones(len(df), dtype=bool)
+        if "_dia" in df.columns:
+            if desde:
+                mask &= (df["_dia"] >= pd.Timestamp(desde)).to_numpy()
+            if hasta:
+                mask &= (df["_dia"] <= pd.Timestamp(hasta)).to_numpy()
+        for param, valores in filtros.items():
+            col = self.columnas.get(param)
+            if valores and col in df.columns:
+                mask &= self._mascara_valores(df[col], valores)
+
+        res = {}
+        for clave, col in self.salidas.items():
+            if col not in df.columns:
+                res[clave] = []
+                continue
+            codigos = np.unique(df[col].cat.codes.to_numpy()[mask])
+            valores = df[col].cat.categories[codigos[codigos >= 0]]
+            res[clave] = sorted(valores.tolist())
+        return res
@@ -0,0 +1,163 @@
+# app/liquidacion.py
+from datetime import date
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from .extensions import db
+
+# Layout fijo (39 columnas, sin encabezado) del archivo de novedades de nómina
+COLUMNAS = [
+    "TipoRegistro","TipoDocumento","NumeroDocumento","Concepto","TipoNovedad","TipoReporte",
+    "ValorTotal","IncluyePago","SumaResta","FechaInicial","CantidadDias",
+    "TipoIncapacidad","Diagnostico","NumeroIncapacidad","FechaRetiro","MotivoRetiro",
+    "AreaFuncional","RangoDiaInicial","RangoHoraInicial","RangoHoraFinal","NumeroDias",
+    "Cantidad","NumeroHoras","Indemnizacion","FechaNovedad","PagoTotal",
+    "NaturalezaIncapacidad","FechaInicialEPS","Proyecto","FechaRetiroReal","Gobierno1","Gobierno2",
+    "FechaIniIncPro","TipoDocEntidad","NumDocEntidad","TipoServicioEntidad",
+    "IncapacidadDiasHab","Observaciones","Docentes"
+]
+
+# Columnas del layout que la liquidación de destajos deja vacías
+COLUMNAS_VACIAS = [
+    "FechaInicial","CantidadDias","TipoIncapacidad","Diagnostico","NumeroIncapacidad",
+    "FechaRetiro","MotivoRetiro","RangoDiaInicial","RangoHoraInicial","RangoHoraFinal",
+    "NumeroDias","NumeroHoras","Indemnizacion","PagoTotal","NaturalezaIncapacidad",
+    "FechaInicialEPS","Proyecto","FechaRetiroReal","Gobierno1","Gobierno2",
+    "FechaIniIncPro","TipoDocEntidad","NumDocEntidad","TipoServicioEntidad",
+    "IncapacidadDiasHab","Observaciones","Docentes"
+]
+
+SMV_DEFECTO = 47450
+
+SQL_REGISTROS = """
+    SELECT
+        CASE
+            WHEN LEFT(e.tipoIdentificacion,11)='Cédula Ciud' THEN 'C'
+            WHEN LEFT(e.tipoIdentificacion,11)='Cédula de E' THEN 'E'
+            WHEN LEFT(e.tipoIdentificacion,11)='Permiso Por' THEN 'PT'
+            ELSE e.tipoIdentificacion
+        END AS TipoDocumento,
+        r.empleado_documento AS NumeroDocumento,
+        d.Concepto,
+        ee.centroCosto AS AreaFuncional,
+        r.cantidad AS Cantidad,
+        ISNULL(d.Valor,0) AS Valor
+    FROM registros_destajo r
+    JOIN GH_Empleados e
+        ON e.numeroDocumento = r.empleado_documento
+    JOIN GH_Destajos d
+        ON d.Id = r.destajo_id
+    OUTER APPLY (
+        SELECT TOP 1 ee.centroCosto
+        FROM GH_Empleados ee
+        WHERE ee.Agrupador4 = d.Planta
+    ) ee
+    WHERE 1=1
+    """
+
+
+def consultar_registros(doc=None, f1=None, f2=None):
+    """
+    Registros de destajo (con tipo de documento, concepto, área y valor) a liquidar.
+    `f1`/`f2` son fechas ISO (YYYY-MM-DD).
+    """
+    sql = SQL_REGISTROS
+    params = {}
+    if f1:
+        sql += " AND r.fecha >= :f1"
+        params['f1'] = date.fromisoformat(f1)
+    if f2:
+        sql += " AND r.fecha <= :f2"
+        params['f2'] = date.fromisoformat(f2)
+    if doc:
+        sql += " AND r.empleado_documento = :doc"
+        params['doc'] = doc
+
+    rows = db.session.execute(text(sql), params).mappings().all()
+    return pd.DataFrame(rows)
+
+
+def _por_valores_unicos(serie, fn, faltante):
+    """
+    Aplica `fn` a los valores distintos de `serie` (conceptos, cantidades: pocos distintos
+    frente al número de filas) y reparte el resultado por fila. `faltante` = valor para nulos.
+    """
+    codigos, unicos = pd.factorize(serie)
+    res = np.asarray(fn(pd.Series(unicos, dtype=object)))
+    if (codigos < 0).any():
+        res = np.append(res.astype(np.result_type(res.dtype, type(faltante))), faltante)
+    return res[codigos]
+
+
+def _contiene(serie, patron, **kwargs):
+    return _por_valores_unicos(serie, lambda u: u.str.contains(patron, **kwargs).fillna(False).astype(bool), False)
+
+
+def _numero(serie):
+    # = pd.to_numeric(serie, errors='coerce').fillna(0) (los Decimal del cursor son lentos fila a fila)
+    res = _por_valores_unicos(serie, lambda u: pd.to_numeric(u, errors='coerce'), np.nan)
+    return pd.Series(res, index=serie.index).fillna(0)
+
+
+def calcular(df, smv=SMV_DEFECTO, fecha_novedad=""):
+    """
+    Liquidación por empleado / concepto / área con el layout de COLUMNAS.
+
+    - JORNAL FESTIVO: SMV × 1.8 × cantidad
+    - JORNAL: SMV × cantidad
+    - DESCANSO: promedio ponderado del empleado (mínimo SMV) × cantidad
+    - resto: sin ValorTotal (novedad tipo 3)
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    df = df.assign(
+        Cantidad=_numero(df['Cantidad']),
+        Valor=_numero(df['Valor']),
+    )
+
+    g = df.groupby(
+        ['TipoDocumento','NumeroDocumento','Concepto','AreaFuncional'],
+        as_index=False
+    ).agg({'Cantidad':'sum','Valor':'mean'})
+
+    # Promedio ponderado por empleado sobre los conceptos que no son DESCANSO/JORNAL
+    especial = _contiene(df['Concepto'], 'DESCANSO|JORNAL', case=False, regex=True)
+    validos = df.loc[~especial, ['NumeroDocumento']].assign(vxq=(df['Valor'] * df['Cantidad'])[~especial])
+    ponderado = validos.groupby('NumeroDocumento')['vxq'].agg(['sum', 'count'])
+    prom_pond = np.maximum(ponderado['sum'] / ponderado['count'], smv)
+
+    concepto = g['Concepto'].str.upper()
+    qty = g['Cantidad'].astype(float).to_numpy()
+    doc = g['NumeroDocumento']
+    prom = np.where(doc.isin(prom_pond.index), doc.map(prom_pond).to_numpy(dtype=float), smv)
+
+    valor_total = np.select(
+        [_contiene(concepto, 'JORNAL FESTIVO', regex=False),
+         _contiene(concepto, 'JORNAL', regex=False),
+         _contiene(concepto, 'DESCANSO', regex=False)],
+        [smv * 1.8 * qty, smv * qty, prom * qty],
+        default=np.nan,
+    )
+
+    novedad_4 = _contiene(g['Concepto'], 'DESCANSO|JORNAL', case=False, regex=True)
+    suma_resta = np.full(len(g), '', dtype=object)
+    suma_resta[novedad_4] = 1
+
+    out = pd.DataFrame({
+        "TipoRegistro": 1,
+        "TipoDocumento": g['TipoDocumento'],
+        "NumeroDocumento": g['NumeroDocumento'],
+        "Concepto": g['Concepto'],
+        "TipoNovedad": np.where(novedad_4, 4, 3),
+        "TipoReporte": 5,
+        "ValorTotal": pd.Series(valor_total, index=g.index).round(2),
+        "IncluyePago": pd.Series(np.where(novedad_4, 'Y', ''), index=g.index),
+        "SumaResta": suma_resta,
+        "AreaFuncional": g['AreaFuncional'],
+        "Cantidad": pd.to_numeric(g['Cantidad'], errors='coerce').round(2),
+        "FechaNovedad": fecha_novedad,
+        **{c: "" for c in COLUMNAS_VACIAS},
+    }, index=g.index)
+
+    return out[COLUMNAS]
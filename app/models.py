@@ -95,6 +95,22 @@ class RegistroDestajo(db.Model):
 
     usuario = db.relationship('User', backref='destajos')
 
+    # listado de /api/registros: keyset por (fecha, id) descendente, con y sin filtro de documento
+    # (en SQL Server se crean con sql/001_registros_destajo_indices.sql)
+    __table_args__ = (
+        db.Index("ix_registros_destajo_fecha_id", "fecha", "id"),
+        db.Index("ix_registros_destajo_doc_fecha_id", "empleado_documento", "fecha", "id"),
+    )
+
+class RegistroDestajoSync(db.Model):
+    # claves de idempotencia de /api/sync: misma base y misma transacción que registros_destajo
+    # (en SQL Server se crea con sql/002_registros_destajo_sync.sql)
+    __tablename__ = "registros_destajo_sync"
+    clave = db.Column(db.String(64), primary_key=True)
+    registro_id = db.Column(db.Integer, nullable=False)
+    usuario_id = db.Column(db.Integer, nullable=False)
+    creado = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class GHDestajo(db.Model):
     __tablename__ = "GH_Destajos"
     Id = db.Column(db.Integer, primary_key=True)
@@ -135,4 +151,70 @@ class GHEmpleado(db.Model):
            "nombreNomina": self.nombreNomina,
            "compania": self.compania,
            "agrupador4": self.agrupador4
-        }
\ No newline at end of file
+        }
+
+# 👇 OFFLINE (SQLite) — cubo diario del dashboard logístico
+class CuboLogistico(db.Model):
+    __tablename__ = "cubo_logistico"
+    __bind_key__ = "local"
+    id = db.Column(db.Integer, primary_key=True)
+    variante = db.Column(db.String(40), nullable=False)   # hash de los filtros del SP (tipo, transporte…)
+    Fecha = db.Column(db.Date, nullable=False)
+    Tipo = db.Column(db.String(100))
+    Origen = db.Column(db.String(200))
+    CiudadOrigen = db.Column(db.String(200))
+    CentroLogistico = db.Column(db.String(200))
+    Material = db.Column(db.String(200))
+    NombreEmpresaTpte = db.Column(db.String(200))
+    Placa = db.Column(db.String(50))
+    Proveedor = db.Column(db.String(200))
+    Toneladas = db.Column(db.Float, nullable=False, default=0)
+    NumViajes = db.Column(db.Float, nullable=False, default=0)
+    Registros = db.Column(db.Integer, nullable=False, default=0)   # pesajes agregados en la fila
+
+    __table_args__ = (db.Index("ix_cubo_logistico_variante_fecha", "variante", "Fecha"),)
+
+class CuboLogisticoDia(db.Model):
+    __tablename__ = "cubo_logistico_dias"
+    __bind_key__ = "local"
+    variante = db.Column(db.String(40), primary_key=True)
+    Fecha = db.Column(db.Date, primary_key=True)
+    actualizado = db.Column(db.DateTime, nullable=False)
+
+# 👇 OFFLINE (SQLite) — versión por tabla para los ETag de la API (compartida entre workers)
+class VersionTabla(db.Model):
+    __tablename__ = "versiones_tabla"
+    __bind_key__ = "local"
+    tabla = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 👇 OFFLINE (SQLite) — exportaciones en segundo plano (compartidas entre workers)
+class TrabajoExportacion(db.Model):
+    __tablename__ = "trabajos_exportacion"
+    __bind_key__ = "local"
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)         # liquidacion, optimizacion…
+    usuario_id = db.Column(db.Integer)
+    estado = db.Column(db.String(20), nullable=False, default="pendiente")  # pendiente | en_curso | listo | error
+    progreso = db.Column(db.Integer, nullable=False, default=0)             # 0-100
+    mensaje = db.Column(db.String(255))
+    nombre_archivo = db.Column(db.String(200))
+    ruta = db.Column(db.String(500))
+    mimetype = db.Column(db.String(120))
+    creado = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    terminado = db.Column(db.DateTime)
+    expira = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "progreso": self.progreso,
+            "mensaje": self.mensaje,
+            "nombre_archivo": self.nombre_archivo,
+            "creado": self.creado.isoformat() if self.creado else None,
+            "terminado": self.terminado.isoformat() if self.terminado else None,
+            "expira": self.expira.isoformat() if self.expira else None,
+        }
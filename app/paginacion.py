@@ -0,0 +1,172 @@
+# app/paginacion.py
+import itertools
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from app.cache import LRUCache, cache_key
+from config import Config
+
+# Resultado completo del SP por consulta ({"df", "resumen", "carga"}) y vistas ordenadas/filtradas
+# sobre él (posiciones). Las páginas siguientes salen de memoria sin volver a ejecutar el SP.
+# Cada carga tiene su número (`carga`): las vistas de un resultado recargado no se reutilizan.
+resultados = LRUCache(maxsize=Config.PAGINAS_CACHE_MAX, ttl=Config.PAGINAS_TTL)
+vistas = LRUCache(maxsize=Config.PAGINAS_CACHE_MAX * 4, ttl=Config.PAGINAS_TTL)
+_cargas = itertools.count(1)
+
+# Textos que las tarjetas de "Registros con alerta" consideran vacíos
+VALORES_ALERTA = {"", "0", "na", "n/a", "no aplica"}
+
+
+def _alerta_columna(serie):
+    # mismo criterio que aplicaba el navegador sobre el JSON de /data
+    if pd.api.types.is_bool_dtype(serie):
+        return np.zeros(len(serie), dtype=bool)
+    if pd.api.types.is_numeric_dtype(serie):
+        return (serie.isna() | (serie == 0)).to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.isna().to_numpy()
+
+    def _alerta(v):
+        if v is None or (isinstance(v, float) and np.isnan(v)) or v is pd.NaT:
+            return True
+        if isinstance(v, bool):
+            return False
+        if isinstance(v, (int, float, np.number)):
+            return v == 0
+        if isinstance(v, (str, Decimal)):
+            return str(v).strip().lower() in VALORES_ALERTA
+        return False
+    return serie.map(_alerta).to_numpy(dtype=bool)
+
+
+def resumen(df, excepciones=None):
+    """
+    KPIs de la consulta completa (los que antes calculaba el navegador sobre todas las filas).
+    `excepciones`: {columna: máscara} de celdas que no cuentan como alerta.
+    """
+    if df.empty:
+        return {"toneladas": 0.0, "viajes": 0.0, "proveedores": 0, "alertas": 0}
+
+    toneladas = pd.to_numeric(df["Toneladas"], errors="coerce").fillna(0).sum() if "Toneladas" in df.columns else 0.0
+    if "NumViajes" in df.columns:
+        viajes = pd.to_numeric(df["NumViajes"], errors="coerce")
+        viajes = viajes.where(viajes.notna() & (viajes != 0), 1).sum()
+    else:
+        viajes = float(len(df))
+    proveedores = int(df["Proveedor"].nunique(dropna=False)) if "Proveedor" in df.columns else 1
+
+    alerta = np.zeros(len(df), dtype=bool)
+    for c in df.columns:
+        col = _alerta_columna(df[c])
+        if excepciones and c in excepciones:
+            col &= ~np.asarray(excepciones[c], dtype=bool)
+        alerta |= col
+
+    return {"toneladas": float(toneladas), "viajes": float(viajes),
+            "proveedores": proveedores, "alertas": int(alerta.sum())}
+
+
+def resultado(nombre, params, cargar, preparar=None, excepciones=None):
+    """
+    Devuelve (clave, entrada) con el resultado completo de `cargar(**params)` cacheado.
+    `preparar(df)` ajusta el frame una vez; `excepciones(df)` alimenta el resumen.
+    Resultados de más de PAGINAS_FILAS_MAX filas se usan para esta petición y no se guardan.
+    """
+    key = cache_key(nombre, params)
+    entrada = resultados.get(key)
+    if entrada is None:
+        df = cargar(**params)
+        if preparar:
+            df = preparar(df)
+        entrada = {"df": df, "resumen": resumen(df, excepciones(df) if excepciones else None),
+                   "carga": next(_cargas), "cacheado": len(df) <= Config.PAGINAS_FILAS_MAX}
+        if entrada["cacheado"]:
+            resultados.set(key, entrada)
+    return key, entrada
+
+
+def _texto(serie):
+    # nulos como "" (astype(str) los vuelve "none"/"nan" y coincidirían con búsquedas como "n")
+    return serie.astype(object).where(serie.notna(), "").astype(str).str.lower()
+
+
+def vista(key, df, orden=None, desc=False, buscar=None, filtros=None, cachear=True):
+    """
+    Posiciones de `df` que cumplen la búsqueda global y los filtros por columna
+    (contiene, sin distinguir mayúsculas), ordenadas por `orden`. `key` debe identificar
+    la carga concreta de `df` (las posiciones no sirven para otro frame).
+    """
+    vkey = cache_key(key, orden, desc, buscar, filtros)
+
+    def _calcular():
+        mask = np.ones(len(df), dtype=bool)
+        if buscar:
+            q = buscar.strip().lower()
+            global_ = np.zeros(len(df), dtype=bool)
+            for c in df.columns:
+                global_ |= _texto(df[c]).str.contains(q, regex=False).to_numpy()
+            mask &= global_
+        for c, q in (filtros or {}).items():
+            if c in df.columns and q:
+                mask &= _texto(df[c]).str.contains(q.strip().lower(), regex=False).to_numpy()
+
+        pos = np.flatnonzero(mask)
+        if orden in df.columns and len(pos):
+            col = df[orden].iloc[pos]
+            try:
+                orden_pos = col.reset_index(drop=True).sort_values(
+                    ascending=not desc, kind="mergesort", na_position="last").index.to_numpy()
+            except TypeError:
+                # tipos mezclados en la columna: se ordena como texto, con los nulos al final
+                orden_pos = col.astype(object).map(str, na_action="ignore").reset_index(drop=True).sort_values(
+                    ascending=not desc, kind="mergesort", na_position="last").index.to_numpy()
+            pos = pos[orden_pos]
+        return pos
+
+    if not cachear:
+        return _calcular()
+    return vistas.get_or_set(vkey, _calcular)
+
+
+def leer_parametros(args, columnas_excluidas=()):
+    """
+    Parámetros de paginación de la petición:
+    tamano, cursor (posición en la vista), orden, dir (asc/desc), buscar y f_<Columna>.
+    """
+    try:
+        tamano = min(max(int(args.get("tamano", Config.PAGINA_TAMANO)), 1), Config.PAGINA_TAMANO_MAX)
+    except ValueError:
+        tamano = Config.PAGINA_TAMANO
+    try:
+        cursor = max(int(args.get("cursor", 0)), 0)
+    except ValueError:
+        cursor = 0
+    filtros = {k[2:]: v for k, v in args.items()
+               if k.startswith("f_") and v and k[2:] not in columnas_excluidas}
+    return {
+        "tamano": tamano,
+        "cursor": cursor,
+        "orden": args.get("orden") or None,
+        "desc": (args.get("dir") or "asc").lower() == "desc",
+        "buscar": args.get("buscar") or None,
+        "filtros": filtros,
+    }
+
+
+def pagina(key, entrada, tamano, cursor=0, orden=None, desc=False, buscar=None, filtros=None):
+    """
+    Una página de la vista pedida, lista para jsonify.
+    """
+    df = entrada["df"]
+    pos = vista((key, entrada["carga"]), df, orden, desc, buscar, filtros, cachear=entrada["cacheado"])
+    trozo = df.iloc[pos[cursor:cursor + tamano]]
+    filas = trozo.astype(object).where(trozo.notna(), None).to_dict("records")
+    siguiente = cursor + tamano if cursor + tamano < len(pos) else None
+    return {
+        "filas": filas,
+        "total": len(df),
+        "filtradas": int(len(pos)),
+        "cursor": cursor,
+        "siguiente": siguiente,
+        "resumen": entrada["resumen"],
+    }
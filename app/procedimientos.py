@@ -0,0 +1,115 @@
+# app/procedimientos.py
+from datetime import date
+import pandas as pd
+from sqlalchemy import text
+from app.extensions import db
+from app.cache import LRUCache, cache_key
+from app.singleflight import coalescer
+from config import Config
+
+# Resultados crudos de los SP (columnas + filas tal como salen del cursor), compartidos
+# por los reportes, su /data y el dashboard. Se guardan crudos para que /data siga
+# devolviendo exactamente lo mismo que antes (sin pasar por los dtypes de pandas).
+resultados = LRUCache(maxsize=Config.SP_CACHE_MAX)
+
+
+def none_if_empty(value):
+    return value if value not in (None, "", []) else None
+
+
+class ResultadoSP:
+    """
+    Resultado de un SP: `columnas` (nombres) y `filas` (tuplas).
+    """
+
+    def __init__(self, columnas, filas):
+        self.columnas = list(columnas)
+        self.filas = filas
+
+    def df(self):
+        return pd.DataFrame(self.filas, columns=self.columnas)
+
+    def __len__(self):
+        return len(self.filas)
+
+
+def _dia(valor):
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        return None
+
+
+def ttl_consulta(params, campo_hasta="fecha_fin"):
+    """
+    Vigencia en cache según el rango: corto si puede incluir hoy (o no tiene fin),
+    largo para periodos cerrados.
+    """
+    hasta = _dia(params.get(campo_hasta)) if params.get(campo_hasta) else None
+    if hasta is None or hasta >= date.today():
+        return Config.SP_TTL_HOY
+    return Config.SP_TTL_CERRADO
+
+
+def normalizar(params):
+    return {k: none_if_empty(v) for k, v in params.items()}
+
+
+def clave(nombre, params):
+    return cache_key("sp", nombre, normalizar(params))
+
+
+def _ejecutar(sql, params):
+    with db.engine.connect().execution_options(stream_results=True) as conn:
+        result = conn.execute(text(sql), params)
+        return ResultadoSP(result.keys(), [tuple(r) for r in result.fetchall()])
+
+
+def ejecutar_sp(nombre, sql, params, ttl=None, cachear=True):
+    """
+    Ejecuta el SP `sql` con `params` normalizados (none_if_empty) y devuelve un ResultadoSP.
+
+    El resultado se cachea por (nombre, parámetros) con `ttl` (por defecto según el rango
+    de fechas, ver `ttl_consulta`) y las llamadas idénticas concurrentes comparten una
+    sola ejecución, también entre workers. Solo se cachean resultados de hasta
+    SP_CACHE_FILAS_MAX filas.
+    """
+    params = normalizar(params)
+    key = clave(nombre, params)
+    if cachear:
+        res = resultados.get(key)
+        if res is not None:
+            return res
+
+    res = coalescer(key, lambda: _ejecutar(sql, params))
+    # resultados muy grandes (históricos completos) no se guardan: cada worker los tendría en memoria
+    if cachear and len(res) <= Config.SP_CACHE_FILAS_MAX:
+        resultados.set(key, res, ttl=ttl if ttl is not None else ttl_consulta(params))
+    return res
+
+
+def cacheado(nombre, params):
+    """
+    Resultado en cache (o None) sin ejecutar nada; para quien envía en streaming.
+    """
+    return resultados.get(clave(nombre, params))
+
+
+def guardar(nombre, params, columnas, filas, ttl=None):
+    """
+    Guarda un resultado que se obtuvo por fuera de `ejecutar_sp` (p. ej. en streaming).
+    """
+    if len(filas) > Config.SP_CACHE_FILAS_MAX:
+        return
+    params = normalizar(params)
+    resultados.set(clave(nombre, params), ResultadoSP(columnas, filas),
+                   ttl=ttl if ttl is not None else ttl_consulta(params))
+
+
+def estadisticas():
+    """
+    Contadores de la cache de SP (hits/misses/tamaño) para monitoreo.
+    """
+    return resultados.stats()
@@ -0,0 +1,167 @@
+# app/singleflight.py
+import inspect
+import logging
+import os
+import pickle
+import threading
+import time
+from functools import wraps
+from app.cache import cache_key
+from config import Config
+
+try:
+    import fcntl  # solo Linux/Unix (gunicorn); en Windows queda solo la coalescencia entre hilos
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Resultados en disco más viejos que esto se borran al escribir uno nuevo (segundos)
+FLIGHT_LIMPIEZA = 600
+# Solo se comparten en disco los resultados que tardaron al menos esto (segundos);
+# los rápidos (p. ej. servidos desde cache) no justifican serializarlos
+FLIGHT_MIN_SEG = 0.5
+
+
+class _Llamada:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas idénticas concurrentes dentro del proceso: mientras una
+    ejecución con la misma clave está en curso, los demás hilos esperan su resultado
+    (como máximo SINGLEFLIGHT_ESPERA segundos; después ejecutan por su cuenta).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            llamada = self._en_curso.get(key)
+            lider = llamada is None
+            if lider:
+                llamada = self._en_curso[key] = _Llamada()
+
+        if not lider:
+            if not llamada.listo.wait(Config.SINGLEFLIGHT_ESPERA):
+                logger.warning(f"Single-flight {key}: la ejecución en curso no terminó a tiempo; se ejecuta aparte")
+                return fn()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = fn()
+            return llamada.resultado
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(key, None)
+            llamada.listo.set()
+
+
+def _bloquear(lock, limite):
+    """
+    flock exclusivo esperando como máximo hasta `limite` (time.monotonic). False si no se obtuvo.
+    """
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+
+
+def _entre_procesos(key, fn):
+    """
+    Coalescencia entre workers de gunicorn: un lock de archivo por clave serializa las
+    llamadas y quien esperaba reutiliza el resultado que el anterior dejó en disco,
+    siempre que haya terminado después de que empezó a esperar. Si el lock no se libera
+    en SINGLEFLIGHT_ESPERA segundos (un líder colgado), se ejecuta sin coalescer.
+    """
+    if fcntl is None:
+        return fn()
+
+    carpeta = Config.SINGLEFLIGHT_DIR
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{key}.pkl")
+    inicio = time.time()
+
+    with open(os.path.join(carpeta, f"{key}.lock"), "a") as lock:
+        if not _bloquear(lock, time.monotonic() + Config.SINGLEFLIGHT_ESPERA):
+            logger.warning(f"Single-flight {key}: lock ocupado más de {Config.SINGLEFLIGHT_ESPERA}s; se ejecuta aparte")
+            return fn()
+        try:
+            try:
+                if os.path.getmtime(ruta) >= inicio:
+                    with open(ruta, "rb") as f:
+                        return pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+
+            t0 = time.time()
+            resultado = fn()
+            if time.time() - t0 < FLIGHT_MIN_SEG:
+                return resultado
+            tmp = f"{ruta}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, ruta)
+            _limpiar(carpeta, ruta)
+            return resultado
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _limpiar(carpeta, actual):
+    limite = time.time() - FLIGHT_LIMPIEZA
+    for nombre in os.listdir(carpeta):
+        ruta = os.path.join(carpeta, nombre)
+        try:
+            if ruta != actual and os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass
+
+
+_grupo = SingleFlight()
+
+
+def coalescer(key, fn):
+    """
+    Ejecuta `fn()` compartiendo el resultado con las llamadas concurrentes de la misma
+    `key`, tanto entre hilos como entre procesos.
+    """
+    return _grupo.do(key, lambda: _entre_procesos(key, fn))
+
+
+def single_flight(nombre, normalizar=None):
+    """
+    Decorador: llamadas concurrentes a la función con el mismo conjunto de parámetros
+    (opcionalmente normalizados con `normalizar(dict) -> dict`) comparten una sola
+    ejecución, tanto entre hilos como entre procesos.
+    """
+    def deco(fn):
+        firma = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            params = firma.bind(*args, **kwargs)
+            params.apply_defaults()
+            params = dict(params.arguments)
+            if normalizar:
+                params = normalizar(params)
+            key = cache_key(nombre, params)
+            return coalescer(key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return deco
@@ -106,8 +106,50 @@ async function idbDelete(db, store, key) {
   });
 }
 
+async function idbCount(db, store) {
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(store, "readonly");
+    const req = tx.objectStore(store).count();
+    req.onsuccess = () => resolve(req.result);
+    req.onerror   = (e) => reject(e.target.error);
+  });
+}
+
+// Aplica un delta del servidor en una sola transacción (todo o nada)
+async function idbAplicarCambios(db, store, upserts, deletes, limpiar = false) {
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(store, "readwrite");
+    const os = tx.objectStore(store);
+    if (limpiar) os.clear();
+    for (const key of deletes) os.delete(key);
+    for (const item of upserts) os.put(item);
+    tx.oncomplete = () => resolve(true);
+    tx.onerror    = (e) => reject(e.target.error);
+    tx.onabort    = (e) => reject(e.target.error);
+  });
+}
+
+// 🔑 Clave de idempotencia de cada registro encolado: el server no lo duplica si el lote se reintenta
+function nuevaClaveSync() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+}
+
 const API = { async get(url){ const r = await fetch(url, {credentials:'same-origin'}); if(!r.ok) throw new Error('Error API'); return r.json(); }, async post(url, data){ const r = await fetch(url, { method:'POST', headers:{'Content-Type':'application/json'}, credentials:'same-origin', body: JSON.stringify(data) }); return r.json(); }, async put(url, data){ const r = await fetch(url, { method:'PUT', headers:{'Content-Type':'application/json'}, credentials:'same-origin', body: JSON.stringify(data) }); return r.json(); }, async del(url){ const r = await fetch(url, {method:'DELETE', credentials:'same-origin'}); return r.json(); } };
 
+// ⏳ Exportaciones en segundo plano: encola el trabajo, consulta su estado y devuelve la URL de descarga
+async function exportarEnSegundoPlano(url, alProgreso) {
+  const t = await API.post(url, {});
+  if (!t || !t.id) throw new Error((t && t.error) || 'No se pudo iniciar la exportación');
+  while (true) {
+    await new Promise(r => setTimeout(r, 1000));
+    const e = await API.get(`/api/exportaciones/${t.id}`);
+    if (alProgreso) alProgreso(e);
+    if (e.estado === 'listo') return `/api/exportaciones/${t.id}/archivo`;
+    if (e.estado === 'error') throw new Error(e.mensaje || 'Error en la exportación');
+  }
+}
+
 function todayISO(){
   const d = new Date();
   const m = String(d.getMonth()+1).padStart(2,'0');
@@ -297,6 +339,7 @@ window.destajosForm = function(){
         destajo_id: this.destajo_id,
         cantidad: this.cantidad,
         fecha: this.fecha,
+        clave: nuevaClaveSync(),
         _edit: false
       };
 
@@ -348,6 +391,9 @@ window.consultarView = function({userId, isAdmin}){
     planta: '',        // la planta seleccionada
     plantas: [],       // lista de plantas
     registros: [],
+    siguiente: null,   // cursor de la próxima página (null = no hay más)
+    resumen: null,     // { total, cantidad, empleados, desde, hasta } del filtro actual
+    cargandoMas: false,
     destajos: [],
     destajosMap: new Map(),
     backup: new Map(),
@@ -391,9 +437,16 @@ window.consultarView = function({userId, isAdmin}){
       if (this.desde) params.append('desde', this.desde);
       if (this.hasta) params.append('hasta', this.hasta);
 
-      const res = await fetch(`/api/liquidacion/excel?${params.toString()}`);
-      const blob = await res.blob();
-      const url = window.URL.createObjectURL(blob);
+      // se genera en segundo plano: no bloquea un worker ni vence por timeout
+      let url;
+      try {
+        url = await exportarEnSegundoPlano(`/api/liquidacion/excel/trabajo?${params.toString()}`,
+          e => console.log(`⏳ Liquidación ${e.progreso}%`));
+      } catch (e) {
+        console.error("❌ Error exportando liquidación", e);
+        alert(e.message);
+        return;
+      }
 
       // genera timestamp AAAAMMDDHHMMSS
       const now = new Date();
@@ -410,7 +463,6 @@ window.consultarView = function({userId, isAdmin}){
       document.body.appendChild(a);
       a.click();
       a.remove();
-      window.URL.revokeObjectURL(url);
     },
 
     async buscar() {
@@ -422,10 +474,22 @@ window.consultarView = function({userId, isAdmin}){
       if(this.hasta) p.set('hasta', this.hasta);
       if(this.planta) p.set('planta', this.planta); // se envía si hay planta elegida
 
+      this.siguiente = null;
+      this.resumen = null;
+
       if (navigator.onLine) {
         try {
-          this.registros = await API.get('/api/registros?' + p.toString());
+          // primera página (keyset por fecha/id) + totales del filtro, en paralelo
+          const pag = new URLSearchParams(p); pag.set('limite', '');
+          const res = new URLSearchParams(p); res.set('modo', 'resumen');
+          const [pagina, resumen] = await Promise.all([
+            API.get('/api/registros?' + pag.toString()),
+            API.get('/api/registros?' + res.toString())
+          ]);
+          this.registros = pagina.items;
           this.registros.forEach(r => r.destajo_id = Number(r.destajo_id));
+          this.siguiente = pagina.siguiente;
+          this.resumen = resumen;
           return;
         } catch (e) {
           console.warn("⚠️ Backend dio error, uso cache local", e);
@@ -451,6 +515,30 @@ window.consultarView = function({userId, isAdmin}){
       }
     },
 
+    async cargarMas() {
+      if (!this.siguiente || this.cargandoMas) return;
+      this.cargandoMas = true;
+
+      const p = new URLSearchParams();
+      if(this.documento) p.set('documento', this.documento);
+      if(this.desde) p.set('desde', this.desde);
+      if(this.hasta) p.set('hasta', this.hasta);
+      if(this.planta) p.set('planta', this.planta);
+      p.set('limite', '');
+      p.set('cursor', this.siguiente);
+
+      try {
+        const pagina = await API.get('/api/registros?' + p.toString());
+        pagina.items.forEach(r => r.destajo_id = Number(r.destajo_id));
+        this.registros = [...this.registros, ...pagina.items];
+        this.siguiente = pagina.siguiente;
+      } catch (e) {
+        console.warn("⚠️ No se pudo cargar la siguiente página", e);
+      } finally {
+        this.cargandoMas = false;
+      }
+    },
+
     editar(r) {
       // Guardamos copia del registro para posible cancelación
       this.backup.set(r.id, JSON.parse(JSON.stringify(r)));
@@ -530,6 +618,7 @@ window.consultarView = function({userId, isAdmin}){
 
         // Clon limpio para IndexedDB (evita DataCloneError)
         const clean = JSON.parse(JSON.stringify({ ...r, ...payload }));
+        if (!clean.clave) clean.clave = nuevaClaveSync();
 
         r._edit = false;
         if (clean.local_id != null) {
@@ -613,11 +702,30 @@ async function trySync(){
   const db = await initDB();
   const items = await idbGetAll(db, STORE_QUEUE);
   if(items.length === 0) return;
-  const payload = items.map(({local_id, ...rest})=>rest);
+
+  // los pendientes antiguos no traen clave: se asigna y se guarda antes de enviar
+  for (const it of items) {
+    if (!it.clave) {
+      it.clave = nuevaClaveSync();
+      await idbPut(db, STORE_QUEUE, it);
+    }
+  }
+
   try {
-    await API.post('/api/sync', payload);
-    await idbClear(db, STORE_QUEUE);
-    console.log('✅ Sincronizado', payload.length);
+    const res = await API.post('/api/sync', items);
+    if (!res || !Array.isArray(res.resultados)) throw new Error((res && res.error) || 'Respuesta inválida');
+
+    // solo salen de la cola los confirmados (creados o ya aplicados antes)
+    let confirmados = 0;
+    for (const r of res.resultados) {
+      if (r.estado === 'creado' || r.estado === 'duplicado') {
+        await idbDelete(db, STORE_QUEUE, r.local_id ?? items[r.indice].local_id);
+        confirmados++;
+      } else {
+        console.warn('⚠️ Registro no sincronizado', items[r.indice], r.error);
+      }
+    }
+    console.log(`✅ Sincronizado ${confirmados}/${items.length}`);
   } catch(e){
     console.warn('⚠️ Sync fallo', e);
   }
@@ -723,45 +831,37 @@ window.addEventListener('load', async () => {
     }
 });
 
-async function syncTable(db, storeName, apiEndpoint, key = "id") {
-    let remoteData;
+// 🔄 Sincronización por diferencias: se envía la versión que tenemos y el server
+// responde { sin_cambios } o { upserts, deletes } (completo=true si no conoce la versión)
+async function syncTable(db, storeName, apiEndpoint) {
+    const claveVersion = `sync_version_${storeName}`;
+    let version = localStorage.getItem(claveVersion) || "";
+    // store vacío (DB recreada o borrada): pedir todo de nuevo
+    if (version && await idbCount(db, storeName) === 0) version = "";
+
+    let delta;
     try {
-        remoteData = await API.get(apiEndpoint);
+        delta = await API.get(`${apiEndpoint}?version=${encodeURIComponent(version)}`);
 
-        // Si la respuesta no es un array válido → abortar
-        if (!Array.isArray(remoteData)) {
+        if (!delta || !delta.version) {
             console.warn(`⚠️ ${storeName}: respuesta inválida del server`);
             return;
         }
-
     } catch (e) {
         console.warn(`⚠️ No se pudo sincronizar ${storeName}`, e);
         return; // ❌ no borres lo local si hubo error
     }
 
-    // Si viene vacío explícitamente, entonces sí limpiar
-    if (remoteData.length === 0) {
-        console.info(`ℹ️ ${storeName}: servidor reporta tabla vacía`);
-        await idbClear(db, storeName);
+    if (delta.sin_cambios) {
+        console.log(`✅ ${storeName} sin cambios`);
         return;
     }
 
-    // 1. Obtener datos locales
-    const localData = await idbGetAll(db, storeName);
-    const localIds = new Set(localData.map(item => item[key]));
-
-    // 2. Upsert
-    for (const item of remoteData) {
-        await idbPut(db, storeName, item);
-        localIds.delete(item[key]);
-    }
-
-    // 3. Borrar los que ya no existen en el server
-    for (const id of localIds) {
-        await idbDelete(db, storeName, id);
-    }
+    await idbAplicarCambios(db, storeName, delta.upserts || [], delta.deletes || [], !!delta.completo);
+    // la versión solo se guarda cuando el delta quedó aplicado
+    localStorage.setItem(claveVersion, delta.version);
 
-    console.log(`✅ ${storeName} sincronizado (${remoteData.length} registros)`);
+    console.log(`✅ ${storeName} sincronizado (${(delta.upserts || []).length} cambios, ${(delta.deletes || []).length} borrados${delta.completo ? ', completo' : ''})`);
 }
 
 async function syncTables() {
@@ -772,7 +872,7 @@ async function syncTables() {
         // await syncTable(db, STORE_USUARIOS, "/auth/users");
         await syncTable(db, STORE_EMPLEADOS, "/api/empleados");
         await syncTable(db, STORE_DESTAJOS, "/api/mdestajos");
-        await syncTable(db, STORE_PLANTAS, "/api/plantas", "Planta"); // <-- agregar plantas
+        await syncTable(db, STORE_PLANTAS, "/api/plantas");
 
         console.log("✅ Tablas locales sincronizadas inteligentemente");
     } catch (e) {
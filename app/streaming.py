@@ -0,0 +1,104 @@
+# app/streaming.py
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import text
+from app.extensions import db
+from app import procedimientos
+from config import Config
+
+
+def _bloques_cursor(sql, params, nombre):
+    """
+    Ejecuta el SP y devuelve (generador de (columnas, bloque de filas), cerrar). Si el
+    resultado se leyó completo y `nombre` está definido, queda en la cache de SP al terminar.
+
+    `cerrar()` libera el cursor y la conexión aunque el generador nunca haya empezado
+    (cerrar un generador sin iniciar no ejecuta su `finally`).
+    """
+    conn = db.engine.connect()
+    try:
+        result = conn.execution_options(stream_results=True, yield_per=Config.STREAM_FILAS).execute(text(sql), params)
+    except Exception:
+        conn.close()
+        raise
+
+    def cerrar():
+        result.close()
+        conn.close()
+
+    def generar():
+        filas = [] if nombre else None
+        try:
+            columnas = list(result.keys())
+            for bloque in result.partitions():
+                bloque = [tuple(r) for r in bloque]
+                if filas is not None:
+                    filas.extend(bloque)
+                    if len(filas) > Config.SP_CACHE_FILAS_MAX:
+                        filas = None   # demasiado grande para cachear: solo se envía
+                yield columnas, bloque
+            if filas is not None:
+                procedimientos.guardar(nombre, params, columnas, filas)
+        finally:
+            cerrar()
+    return generar(), cerrar
+
+
+def _bloques_cache(res):
+    n = Config.STREAM_FILAS
+    for i in range(0, len(res.filas), n):
+        yield res.columnas, res.filas[i:i + n]
+
+
+def respuesta_filas(sql, params, formato="json", transformar=None, nombre=None):
+    """
+    Ejecuta `sql` y envía las filas a medida que llegan, en bloques de Config.STREAM_FILAS,
+    sin armar la lista completa en memoria.
+
+    - formato="json": un arreglo JSON (mismo contenido que jsonify(rows)).
+    - formato="ndjson": una fila JSON por línea.
+    - `transformar(fila)`: ajuste por fila (dict) antes de serializar.
+    - `nombre`: usa la cache de SP (app.procedimientos) con ese nombre de consulta.
+
+    El SP se ejecuta antes de devolver la respuesta, así un error sigue siendo un 500.
+    """
+    params = procedimientos.normalizar(params)
+    cacheado = procedimientos.cacheado(nombre, params) if nombre else None
+    if cacheado is not None:
+        bloques, cerrar = _bloques_cache(cacheado), (lambda: None)
+    else:
+        bloques, cerrar = _bloques_cursor(sql, params, nombre)
+
+    dumps = current_app.json.dumps
+    ndjson = formato == "ndjson"
+
+    def generar():
+        try:
+            primero = True
+            if not ndjson:
+                yield "["
+            for columnas, bloque in bloques:
+                if not bloque:
+                    continue
+                partes = []
+                for r in bloque:
+                    fila = dict(zip(columnas, r))
+                    if transformar:
+                        transformar(fila)
+                    partes.append(dumps(fila))
+                if ndjson:
+                    yield "\n".join(partes) + "\n"
+                else:
+                    yield ("" if primero else ",") + ",".join(partes)
+                primero = False
+            if not ndjson:
+                yield "]"
+        finally:
+            # cliente desconectado: libera la conexión de inmediato
+            bloques.close()
+            cerrar()
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+    resp = Response(stream_with_context(generar()), mimetype=mimetype)
+    # también si la respuesta se cierra antes de pedir el primer bloque
+    resp.call_on_close(cerrar)
+    return resp
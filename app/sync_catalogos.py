@@ -0,0 +1,131 @@
+# app/sync_catalogos.py
+import hashlib
+import json
+import os
+import threading
+import time
+from sqlalchemy import text
+from .extensions import db
+from .models import GHEmpleado
+from .catalogo_destajos import catalogo_destajos
+from config import Config
+
+SQL_PLANTAS = """
+    SELECT DISTINCT Planta
+    FROM GH_Plantas
+    WHERE Planta IS NOT NULL AND LTRIM(RTRIM(Planta)) <> ''
+    ORDER BY Planta
+"""
+
+
+def _hash(fila):
+    raw = json.dumps(fila, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class CatalogoSync:
+    """
+    Sincronización por diferencias de un catálogo offline (IndexedDB).
+
+    La versión es un hash del contenido: cada versión servida deja en disco un snapshot
+    {clave: hash de la fila}, compartido por todos los workers. Con la versión que tiene el
+    cliente se calculan solo las filas nuevas/modificadas (`upserts`) y las claves borradas
+    (`deletes`). Una versión desconocida o vencida recibe el catálogo completo.
+
+    - `cargar()`: lista de dicts (una fila por elemento del catálogo).
+    - `clave`: nombre del campo que identifica la fila (el keyPath del store en IndexedDB).
+    """
+
+    def __init__(self, nombre, cargar, clave):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.clave = clave
+        self._lock = threading.Lock()
+        self._estado = None          # (version, filas {clave: fila}, hashes {clave: hash})
+        self._cargado = 0.0
+
+    @property
+    def _dir(self):
+        return os.path.join(Config.SYNC_DIR, self.nombre)
+
+    def _ruta(self, version):
+        return os.path.join(self._dir, f"{version}.json")
+
+    def _guardar_snapshot(self, version, hashes):
+        ruta = self._ruta(version)
+        if os.path.exists(ruta):
+            os.utime(ruta)
+            return
+        os.makedirs(self._dir, exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            # pares [clave, hash] para conservar el tipo de la clave (Id numérico)
+            json.dump([[k, h] for k, h in hashes.items()], f)
+        os.replace(tmp, ruta)
+
+        # solo se conservan las versiones más recientes
+        snaps = sorted((os.path.join(self._dir, n) for n in os.listdir(self._dir) if n.endswith(".json")),
+                       key=os.path.getmtime, reverse=True)
+        for viejo in snaps[Config.SYNC_VERSIONES:]:
+            try:
+                os.remove(viejo)
+            except OSError:
+                pass
+
+    def _leer_snapshot(self, version):
+        if not version or not all(c in "0123456789abcdef" for c in version):
+            return None
+        try:
+            with open(self._ruta(version), encoding="utf-8") as f:
+                return {k: h for k, h in json.load(f)}
+        except (OSError, ValueError):
+            return None
+
+    def estado(self):
+        """
+        (version, filas, hashes) actuales; se recarga como máximo cada SYNC_TTL segundos.
+        """
+        with self._lock:
+            if self._estado is None or time.monotonic() - self._cargado >= Config.SYNC_TTL:
+                filas = {f[self.clave]: f for f in self.cargar()}
+                hashes = {k: _hash(f) for k, f in filas.items()}
+                version = _hash(sorted((str(k), h) for k, h in hashes.items()))
+                self._guardar_snapshot(version, hashes)
+                self._estado = (version, filas, hashes)
+                self._cargado = time.monotonic()
+            return self._estado
+
+    def delta(self, version_cliente=None):
+        version, filas, hashes = self.estado()
+        if version_cliente == version:
+            return {"version": version, "sin_cambios": True}
+
+        previo = self._leer_snapshot(version_cliente)
+        if previo is None:
+            return {"version": version, "completo": True, "upserts": list(filas.values()), "deletes": []}
+
+        return {
+            "version": version,
+            "completo": False,
+            "upserts": [filas[k] for k, h in hashes.items() if previo.get(k) != h],
+            "deletes": [k for k in previo if k not in hashes],
+        }
+
+
+def _empleados():
+    return [e.to_dict() for e in GHEmpleado.query.all()]
+
+
+def _destajos():
+    return catalogo_destajos.todos()
+
+
+def _plantas():
+    rows = db.session.execute(text(SQL_PLANTAS)).mappings().all()
+    return [{'Planta': r['Planta']} for r in rows]
+
+
+# Catálogos offline: la clave es el keyPath del store correspondiente en indexedDB.js
+empleados = CatalogoSync("empleados", _empleados, "numeroDocumento")
+destajos = CatalogoSync("destajos", _destajos, "Id")
+plantas = CatalogoSync("plantas", _plantas, "Planta")
@@ -0,0 +1,98 @@
+# app/sync_registros.py
+import logging
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .models import RegistroDestajo, RegistroDestajoSync
+from . import condicional
+
+logger = logging.getLogger(__name__)
+
+# SQL Server admite como máximo 2100 parámetros por consulta
+LOTE_CLAVES = 1000
+MAX_CLAVE = 64
+
+
+def _existentes(claves):
+    encontradas = {}
+    claves = list(claves)
+    for i in range(0, len(claves), LOTE_CLAVES):
+        lote = claves[i:i + LOTE_CLAVES]
+        for s in RegistroDestajoSync.query.filter(RegistroDestajoSync.clave.in_(lote)).all():
+            encontradas[s.clave] = s.registro_id
+    return encontradas
+
+
+def _registro(item, usuario_id):
+    return RegistroDestajo(
+        empleado_documento=item['empleado_documento'],
+        empleado_nombre=item['empleado_nombre'],
+        destajo_id=int(item['destajo_id']) if item.get('destajo_id') else -1,
+        cantidad=float(item['cantidad']),
+        fecha=datetime.fromisoformat(item['fecha']).date(),
+        usuario_id=usuario_id
+    )
+
+
+def _intentar(items, usuario_id):
+    claves = {str(i['clave'])[:MAX_CLAVE] for i in items if isinstance(i, dict) and i.get('clave')}
+    existentes = _existentes(claves)
+
+    resultados, nuevos, vistas = [], [], {}
+    for idx, item in enumerate(items):
+        res = {'indice': idx}
+        if isinstance(item, dict):
+            res['local_id'] = item.get('local_id')
+            clave = str(item['clave'])[:MAX_CLAVE] if item.get('clave') else None
+        else:
+            clave = None
+        res['clave'] = clave
+        resultados.append(res)
+
+        if clave in existentes:
+            res.update(estado='duplicado', id=existentes[clave])
+            continue
+        if clave in vistas:
+            # repetido dentro del mismo lote: se resuelve con el id del primero
+            vistas[clave].append(res)
+            continue
+        try:
+            reg = _registro(item, usuario_id)
+        except (KeyError, TypeError, ValueError) as e:
+            res.update(estado='error', error=f"Dato inválido: {e}")
+            continue
+        nuevos.append((res, reg))
+        if clave:
+            vistas[clave] = []
+
+    if nuevos:
+        # un solo flush: SQLAlchemy agrupa los INSERT (insertmanyvalues) y trae los ids
+        db.session.add_all([reg for _, reg in nuevos])
+        db.session.flush()
+        db.session.add_all([
+            RegistroDestajoSync(clave=res['clave'], registro_id=reg.id, usuario_id=usuario_id)
+            for res, reg in nuevos if res['clave']
+        ])
+        for res, reg in nuevos:
+            res.update(estado='creado', id=reg.id)
+            for repetido in vistas.get(res['clave'], ()):
+                repetido.update(estado='duplicado', id=reg.id)
+        condicional.tocar("registros_destajo")
+    db.session.commit()
+    return resultados
+
+
+def ingresar(items, usuario_id):
+    """
+    Inserta en bloque los registros de la cola offline. Cada item puede traer `clave`
+    (idempotencia): si ya se aplicó, se devuelve el id existente sin duplicar.
+    Devuelve una lista de resultados por item, en el mismo orden:
+    {indice, local_id, clave, estado: creado | duplicado | error, id | error}.
+    """
+    try:
+        return _intentar(items, usuario_id)
+    except IntegrityError:
+        # otro request aplicó las mismas claves al mismo tiempo: se repite y salen como duplicado
+        db.session.rollback()
+        logger.info("Claves de sync concurrentes; reintentando el lote")
+        return _intentar(items, usuario_id)
@@ -0,0 +1,97 @@
+# app/trabajos.py
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from .extensions import db
+from .models import TrabajoExportacion
+from . import exportar
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Las exportaciones corren fuera del request; el estado vive en SQLite (bind local),
+# así que cualquier worker de gunicorn puede responder el estado y entregar el archivo.
+_pool = ThreadPoolExecutor(max_workers=Config.EXPORT_WORKERS, thread_name_prefix="exportacion")
+
+
+def _actualizar(trabajo_id, **campos):
+    TrabajoExportacion.query.filter_by(id=trabajo_id).update(campos)
+    db.session.commit()
+
+
+def _limpiar_vencidos():
+    ahora = datetime.now()
+    for t in TrabajoExportacion.query.filter(TrabajoExportacion.expira < ahora).all():
+        if t.ruta:
+            try:
+                os.remove(t.ruta)
+            except OSError:
+                pass
+        db.session.delete(t)
+    db.session.commit()
+
+
+def _correr(app, trabajo_id, generar, formato, encabezado, hoja):
+    with app.app_context():
+        try:
+            _actualizar(trabajo_id, estado="en_curso", progreso=5, mensaje="Consultando datos…")
+            df = generar()
+
+            _actualizar(trabajo_id, progreso=40, mensaje=f"Escribiendo {len(df)} filas…")
+            ext = exportar.FORMATOS[formato][0]
+            ruta = os.path.join(Config.EXPORT_DIR, f"{trabajo_id}.{ext}")
+
+            def progreso(listas, total):
+                _actualizar(trabajo_id, progreso=40 + int(55 * listas / max(total, 1)))
+
+            exportar.escribir(df, ruta, formato, encabezado, hoja, progreso=progreso)
+            _actualizar(trabajo_id, estado="listo", progreso=100, mensaje=None, ruta=ruta,
+                        terminado=datetime.now(),
+                        expira=datetime.now() + timedelta(seconds=Config.EXPORT_TTL))
+        except Exception as e:
+            logger.exception(f"Error en exportación {trabajo_id}")
+            db.session.rollback()
+            _actualizar(trabajo_id, estado="error", mensaje=str(e)[:255], terminado=datetime.now())
+        finally:
+            db.session.remove()
+
+
+def encolar(app, tipo, generar, nombre_base, usuario_id=None, formato="xlsx", encabezado=True, hoja="Sheet1"):
+    """
+    Registra una exportación y la ejecuta en el pool. `generar()` devuelve el DataFrame
+    a exportar y corre dentro de un app context. Devuelve el TrabajoExportacion creado.
+    """
+    if formato not in exportar.FORMATOS:
+        formato = "xlsx"
+    os.makedirs(Config.EXPORT_DIR, exist_ok=True)
+    _limpiar_vencidos()
+
+    ext, mimetype, _ = exportar.FORMATOS[formato]
+    trabajo = TrabajoExportacion(
+        id=uuid.uuid4().hex,
+        tipo=tipo,
+        usuario_id=usuario_id,
+        nombre_archivo=f"{nombre_base}.{ext}",
+        mimetype=mimetype,
+        # mientras corre, un trabajo huérfano (worker reiniciado) también vence
+        expira=datetime.now() + timedelta(seconds=Config.EXPORT_TTL),
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+
+    _pool.submit(_correr, app, trabajo.id, generar, formato, encabezado, hoja)
+    return trabajo
+
+
+def obtener(trabajo_id, usuario):
+    """
+    Trabajo vigente del usuario (los admin ven todos) o None.
+    """
+    t = db.session.get(TrabajoExportacion, trabajo_id)
+    if t is None or t.expira < datetime.now():
+        return None
+    if t.usuario_id != usuario.id and not getattr(usuario, "is_admin", False):
+        return None
+    return t
@@ -1,8 +1,21 @@
 # app/reporte/data.py
 from datetime import datetime
-import pandas as pd
-from sqlalchemy import text
-from app.extensions import db
+from app.procedimientos import ejecutar_sp, none_if_empty
+from app.indice_distintos import IndiceDistintos
+from config import Config
+
+SQL_INFORME_INGRESOS = """
+    EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeIngresos
+        @tipo=:tipo,
+        @fecha_inicio=:fecha_inicio,
+        @fecha_fin=:fecha_fin,
+        @centro=:centro,
+        @material=:material,
+        @proveedor=:proveedor,
+        @almacen=:almacen,
+        @origen=:origen
+"""
+
 
 def parse_date(fecha_str):
     if fecha_str:
@@ -12,22 +25,7 @@ def parse_date(fecha_str):
             return None
     return None
 
-def none_if_empty(value):
-    return value if value not in (None, "", []) else None
-
 def obtener_reporte(tipo=None, desde=None, hasta=None, centro=None, material=None, proveedor=None, almacen=None, origen=None):
-    sql = """
-        EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeIngresos
-            @tipo=:tipo,
-            @fecha_inicio=:fecha_inicio,
-            @fecha_fin=:fecha_fin,
-            @centro=:centro,
-            @material=:material,
-            @proveedor=:proveedor,
-            @almacen=:almacen,
-            @origen=:origen
-    """
-
     params = {
         "tipo": none_if_empty(tipo),
         "fecha_inicio": none_if_empty(desde),
@@ -39,8 +37,27 @@ def obtener_reporte(tipo=None, desde=None, hasta=None, centro=None, material=Non
         "origen": none_if_empty(origen)
     }
 
-    with db.engine.connect() as conn:
-        result = conn.execute(text(sql), params)
-        df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    # cacheado y coalescido por el servicio de SP (mismo resultado que usa /data)
+    return ejecutar_sp("informe_ingresos", SQL_INFORME_INGRESOS, params).df()
+
 
-    return df
+# Valores de los dropdowns: historial completo por tipo, filtrado en memoria
+indice_filtros = IndiceDistintos(
+    "informe_ingresos",
+    cargar=lambda tipo: obtener_reporte(tipo),
+    columnas={
+        "centro": "CentroLogistico",
+        "material": "Material",
+        "proveedor": "Proveedor",
+        "almacen": "Almacen",
+        "origen": "Origen",
+    },
+    salidas={
+        "centros": "CentroLogistico",
+        "materiales": "Material",
+        "proveedores": "Proveedor",
+        "almacenes": "Almacen",
+        "origenes": "Origen",
+    },
+    refresco=Config.FILTROS_REFRESCO,
+)
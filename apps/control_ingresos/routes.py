@@ -1,10 +1,9 @@
 # routes.py
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required
-from .data import obtener_reporte, parse_date
-import pandas as pd
-from sqlalchemy import text
-from app.extensions import db
+from .data import indice_filtros, obtener_reporte, parse_date, SQL_INFORME_INGRESOS
+from app.streaming import respuesta_filas
+from app import paginacion
 
 repingresos_bp = Blueprint(
     "ingresos", __name__,
@@ -16,20 +15,12 @@ repingresos_bp = Blueprint(
 @repingresos_bp.route("/")
 @login_required
 def index():
-    df = obtener_reporte()
-    centros = sorted(df['CentroLogistico'].dropna().unique()) if 'CentroLogistico' in df.columns else []
-    materiales = sorted(df['Material'].dropna().unique()) if 'Material' in df.columns else []
-    proveedores = sorted(df['Proveedor'].dropna().unique()) if 'Proveedor' in df.columns else []
-    almacenes = sorted(df['Almacen'].dropna().unique()) if 'Almacen' in df.columns else []
-    origenes = sorted(df['Origen'].dropna().unique()) if 'Origen' in df.columns else []
+    indice_filtros.iniciar(current_app._get_current_object())
+    valores = indice_filtros.consultar()
 
     return render_template(
         "control_ingreso/index.html",
-        centros=centros,
-        materiales=materiales,
-        proveedores=proveedores,
-        almacenes=almacenes,
-        origenes=origenes
+        **valores
     )
 
 def _get_list_param(name):
@@ -49,19 +40,7 @@ def get_data():
     almacen = request.args.get("almacen") or None
     origen = request.args.get("origen") or None
 
-    sql = text("""
-        EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeIngresos
-            @tipo = :tipo,
-            @fecha_inicio = :fecha_inicio,
-            @fecha_fin = :fecha_fin,
-            @centro = :centro,
-            @material = :material,
-            @proveedor = :proveedor,
-            @almacen = :almacen,
-            @origen = :origen
-    """)
-
-    result = db.session.execute(sql, {
+    params = {
         "tipo": tipo,
         "fecha_inicio": fecha_inicio,
         "fecha_fin": fecha_fin,
@@ -70,10 +49,22 @@ def get_data():
         "proveedor": proveedor,
         "almacen": almacen,
         "origen": origen
-    })
+    }
+
+    # Streaming: arreglo JSON por defecto o ?formato=ndjson (una fila por línea)
+    return respuesta_filas(SQL_INFORME_INGRESOS, params, request.args.get("formato", "json"),
+                           nombre="informe_ingresos")
 
-    rows = [dict(r) for r in result.mappings()]
-    return jsonify(rows)
+@repingresos_bp.route("/pagina")
+@login_required
+def pagina():
+    """
+    Página de resultados (orden, búsqueda y filtros por columna en servidor) + KPIs de la consulta.
+    """
+    consulta = {k: request.args.get(k) or None for k in (
+        "tipo", "desde", "hasta", "centro", "material", "proveedor", "almacen", "origen")}
+    key, entrada = paginacion.resultado("informe_ingresos", consulta, obtener_reporte)
+    return jsonify(paginacion.pagina(key, entrada, **paginacion.leer_parametros(request.args)))
 
 @repingresos_bp.route("/filtros", methods=["GET"])
 @login_required
@@ -87,12 +78,9 @@ def filtros():
     almacen = _get_list_param("almacen")
     origen = _get_list_param("origen")
 
-    df = obtener_reporte(tipo, desde, hasta, centro, material, proveedor, almacen, origen)
-
-    return jsonify({
-        "centros": sorted(df['CentroLogistico'].dropna().unique()) if 'CentroLogistico' in df.columns else [],
-        "materiales": sorted(df['Material'].dropna().unique()) if 'Material' in df.columns else [],
-        "proveedores": sorted(df['Proveedor'].dropna().unique()) if 'Proveedor' in df.columns else [],
-        "almacenes": sorted(df['Almacen'].dropna().unique()) if 'Almacen' in df.columns else [],
-        "origenes": sorted(df['Origen'].dropna().unique()) if 'Origen' in df.columns else []
-    })
+    indice_filtros.iniciar(current_app._get_current_object())
+    return jsonify(indice_filtros.consultar(
+        tipo, desde, hasta,
+        centro=centro, material=material, proveedor=proveedor,
+        almacen=almacen, origen=origen,
+    ))
@@ -1,8 +1,22 @@
 # app/reporte/data.py
 from datetime import datetime
-import pandas as pd
-from sqlalchemy import text
-from app.extensions import db
+from app.procedimientos import ejecutar_sp, none_if_empty
+from app.indice_distintos import IndiceDistintos
+from config import Config
+
+SQL_INFORME_LOGISTICO = """
+    EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeLogistico
+        @tipo=:tipo,
+        @fecha_inicio=:fecha_inicio,
+        @fecha_fin=:fecha_fin,
+        @pedido=:pedido,
+        @origen=:origen,
+        @destino=:destino,
+        @transportadora=:transportadora,
+        @placa=:placa,
+        @proveedor_mat=:proveedor_mat
+"""
+
 
 def parse_date(fecha_str):
     if fecha_str:
@@ -12,24 +26,7 @@ def parse_date(fecha_str):
             return None
     return None
 
-def none_if_empty(value):
-    return value if value not in (None, "", []) else None
-
 def obtener_reporte(tipo=None, desde=None, hasta=None, pedido=None, origen=None, destino=None, transportadora=None, placa=None, proveedor_mat=None):
-    sql = """
-        EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeLogistico
-            @tipo=:tipo,
-            @fecha_inicio=:fecha_inicio,
-            @fecha_fin=:fecha_fin,
-            @pedido=:pedido,
-            @origen=:origen,
-            @destino=:destino,
-            @transportadora=:transportadora,
-            @placa=:placa,
-            @proveedor_mat=:proveedor_mat
-    
-    """
-
     params = {
         "tipo": none_if_empty(tipo),
         "fecha_inicio": none_if_empty(desde),
@@ -42,8 +39,29 @@ def obtener_reporte(tipo=None, desde=None, hasta=None, pedido=None, origen=None,
         "proveedor_mat": none_if_empty(proveedor_mat)
     }
 
-    with db.engine.connect() as conn:
-        result = conn.execute(text(sql), params)
-        df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    # cacheado y coalescido por el servicio de SP (mismo resultado que usa /data)
+    return ejecutar_sp("informe_logistico", SQL_INFORME_LOGISTICO, params).df()
+
 
-    return df
+# Valores de los dropdowns: historial completo por tipo, filtrado en memoria
+indice_filtros = IndiceDistintos(
+    "informe_logistico",
+    cargar=lambda tipo: obtener_reporte(tipo),
+    columnas={
+        "pedido": "NumeroPedido",
+        "origen": "Origen",
+        "destino": "CentroLogistico",
+        "transportadora": "NombreEmpresaTpte",
+        "placa": "Placa",
+        "proveedor_mat": "Proveedor",
+    },
+    salidas={
+        "pedidos": "NumeroPedido",
+        "origenes": "Origen",
+        "destinos": "CentroLogistico",
+        "transportadoras": "NombreEmpresaTpte",
+        "placas": "Placa",
+        "proveedores": "Proveedor",
+    },
+    refresco=Config.FILTROS_REFRESCO,
+)
@@ -1,10 +1,10 @@
 # routes.py
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required
-from .data import obtener_reporte, parse_date
+from .data import indice_filtros, obtener_reporte, parse_date, SQL_INFORME_LOGISTICO
 import pandas as pd
-from sqlalchemy import text
-from app.extensions import db
+from app.streaming import respuesta_filas
+from app import paginacion
 
 informes_bp = Blueprint(
     "informes", __name__,
@@ -16,22 +16,12 @@ informes_bp = Blueprint(
 @informes_bp.route("/")
 @login_required
 def index():
-    df = obtener_reporte()
-    pedidos = sorted(df['NumeroPedido'].dropna().unique()) if 'NumeroPedido' in df.columns else []
-    origenes = sorted(df['Origen'].dropna().unique()) if 'Origen' in df.columns else []
-    destinos = sorted(df['CentroLogistico'].dropna().unique()) if 'CentroLogistico' in df.columns else []
-    transportadoras = sorted(df['NombreEmpresaTpte'].dropna().unique()) if 'NombreEmpresaTpte' in df.columns else []
-    placas = sorted(df['Placa'].dropna().unique()) if 'Placa' in df.columns else []
-    proveedores = sorted(df['Proveedor'].dropna().unique()) if 'Proveedor' in df.columns else []
-    
+    indice_filtros.iniciar(current_app._get_current_object())
+    valores = indice_filtros.consultar()
+
     return render_template(
         "reporte/index.html",
-        pedidos=pedidos,
-        origenes=origenes,
-        destinos=destinos,
-        transportadoras=transportadoras,
-        placas=placas,
-        proveedores=proveedores,
+        **valores,
     )
 
 def _get_list_param(name):
@@ -52,21 +42,7 @@ def get_data():
     placa = request.args.get("placa") or None
     proveedor_mat = request.args.get("proveedor_mat") or None
 
-    sql = text("""
-        EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeLogistico
-            @tipo = :tipo,
-            @fecha_inicio = :fecha_inicio,
-            @fecha_fin = :fecha_fin,
-            @pedido = :pedido,
-            @origen = :origen,
-            @destino = :destino,
-            @transportadora = :transportadora,
-            @placa = :placa,
-            @proveedor_mat = :proveedor_mat
-            
-    """)
-
-    result = db.session.execute(sql, {
+    params = {
         "tipo": tipo,
         "fecha_inicio": fecha_inicio,
         "fecha_fin": fecha_fin,
@@ -77,16 +53,42 @@ def get_data():
         "placa": placa,
         "proveedor_mat": proveedor_mat,
         
-    })
-
-    rows = [dict(r) for r in result.mappings()]
+    }
 
     # 🔒 Convertir NumTiquete a string para conservar ceros
-    for row in rows:
+    def _tiquete(row):
         if "NumTiquete" in row and row["NumTiquete"] is not None:
             row["NumTiquete"] = str(row["NumTiquete"])
 
-    return jsonify(rows)
+    # Streaming: arreglo JSON por defecto o ?formato=ndjson (una fila por línea)
+    return respuesta_filas(SQL_INFORME_LOGISTICO, params, request.args.get("formato", "json"),
+                           transformar=_tiquete, nombre="informe_logistico")
+
+def _tiquetes_a_texto(df):
+    # 🔒 NumTiquete como string para conservar ceros (igual que /data)
+    if "NumTiquete" in df.columns:
+        df = df.assign(NumTiquete=df["NumTiquete"].map(lambda v: None if pd.isna(v) else str(v)))
+    return df
+
+
+def _trailer_volqueta(df):
+    # en volquetas el Trailer vacío no es alerta
+    if "Trailer" not in df.columns or "TipoVehiculo" not in df.columns:
+        return {}
+    return {"Trailer": df["TipoVehiculo"].astype(str).str.lower().str.contains("volqueta", regex=False).to_numpy()}
+
+
+@informes_bp.route("/pagina")
+@login_required
+def pagina():
+    """
+    Página de resultados (orden, búsqueda y filtros por columna en servidor) + KPIs de la consulta.
+    """
+    consulta = {k: request.args.get(k) or None for k in (
+        "tipo", "desde", "hasta", "pedido", "origen", "destino", "transportadora", "placa", "proveedor_mat")}
+    key, entrada = paginacion.resultado("informe_logistico", consulta, obtener_reporte,
+                                        preparar=_tiquetes_a_texto, excepciones=_trailer_volqueta)
+    return jsonify(paginacion.pagina(key, entrada, **paginacion.leer_parametros(request.args)))
 
 @informes_bp.route("/filtros", methods=["GET"])
 @login_required
@@ -101,13 +103,9 @@ def filtros():
     placa = _get_list_param("placa")
     proveedor_mat = _get_list_param("proveedor_mat")
 
-    df = obtener_reporte(tipo, desde, hasta, pedido, origen, destino, transportadora, placa, proveedor_mat)
-
-    return jsonify({
-        "pedidos": sorted(df['NumeroPedido'].dropna().unique()) if 'NumeroPedido' in df.columns else [],
-        "origenes": sorted(df['Origen'].dropna().unique()) if 'Origen' in df.columns else [],
-        "destinos": sorted(df['CentroLogistico'].dropna().unique()) if 'CentroLogistico' in df.columns else [],
-        "transportadoras": sorted(df['NombreEmpresaTpte'].dropna().unique()) if 'NombreEmpresaTpte' in df.columns else [],
-        "placas": sorted(df['Placa'].dropna().unique()) if 'Placa' in df.columns else [],
-        "proveedores": sorted(df['Proveedor'].dropna().unique()) if 'Proveedor' in df.columns else []
-    })
+    indice_filtros.iniciar(current_app._get_current_object())
+    return jsonify(indice_filtros.consultar(
+        tipo, desde, hasta,
+        pedido=pedido, origen=origen, destino=destino,
+        transportadora=transportadora, placa=placa, proveedor_mat=proveedor_mat,
+    ))
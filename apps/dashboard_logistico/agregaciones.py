@@ -0,0 +1,99 @@
+# apps/dashboard_logistico/agregaciones.py
+
+import pandas as pd
+
+# Dimensiones que usan los gráficos; las que son categóricas comparten códigos
+# entre todos los group-by del dashboard.
+DIMENSIONES = ["Origen", "CiudadOrigen", "CentroLogistico", "Material", "Placa"]
+CATEGORICAS = ["Origen", "Material", "Placa", "CentroLogistico"]
+
+
+def a_categoricas(df):
+    """
+    Convierte Origen/Material/Placa/CentroLogistico a `category` (una sola vez, al cachear el frame).
+    """
+    cols = {c: df[c].astype("category") for c in CATEGORICAS
+            if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)}
+    return df.assign(**cols) if cols else df
+
+
+def _etiqueta(valor):
+    # mismo texto que producía astype(str) sobre los nulos del SP
+    return "None" if pd.isna(valor) else str(valor)
+
+
+def agregar(df):
+    """
+    Recorre el frame filtrado una sola vez: agrupa por todas las dimensiones + día y
+    de ese resultado (pequeño) salen todos los rankings, la evolución y los KPIs.
+    Acepta filas del SP o del cubo diario (donde `Registros` cuenta los pesajes de cada fila).
+    Devuelve un dict con un DataFrame por gráfico (sin recortar a Top N) y los KPIs.
+    """
+    kpis = {
+        "toneladas": df["Toneladas"].astype(float).sum() if "Toneladas" in df.columns else 0,
+        "viajes": df["NumViajes"].astype(float).sum() if "NumViajes" in df.columns else len(df),
+        "proveedores": int(df["Proveedor"].nunique()) if "Proveedor" in df.columns else 0,
+    }
+    res = {"kpis": kpis}
+    if "Toneladas" not in df.columns:
+        return res
+
+    claves = [c for c in DIMENSIONES if c in df.columns]
+    base = df[claves].assign(Toneladas=df["Toneladas"].astype(float))
+    if "Fecha" in df.columns:
+        fechas = df["Fecha"]
+        if not pd.api.types.is_datetime64_any_dtype(fechas):
+            fechas = pd.to_datetime(fechas, errors="coerce", dayfirst=True)
+        base["Dia"] = fechas.dt.normalize()
+        claves = claves + ["Dia"]
+    if not claves:
+        return res
+
+    # 🔹 única pasada sobre las filas del SP
+    agg = {"Toneladas": ("Toneladas", "sum")}
+    if "Placa" in base.columns:
+        if "Registros" in df.columns:
+            base["Viajes"] = df["Registros"].where(df["Placa"].notna(), 0)
+            agg["Viajes"] = ("Viajes", "sum")
+        else:
+            agg["Viajes"] = ("Placa", "count")
+    micro = base.groupby(claves, observed=True, dropna=False, sort=False).agg(**agg).reset_index()
+
+    def _total(por, dropna=True):
+        return (micro.groupby(por, observed=True, dropna=dropna)["Toneladas"].sum()
+                .reset_index().sort_values("Toneladas", ascending=False))
+
+    if "Origen" in micro.columns and "CentroLogistico" in micro.columns:
+        rutas = _total(["Origen", "CentroLogistico"], dropna=False)
+        rutas["Ruta"] = [f"{_etiqueta(o)} → {_etiqueta(c)}"
+                         for o, c in zip(rutas["Origen"], rutas["CentroLogistico"])]
+        res["rutas"] = rutas.groupby("Ruta")["Toneladas"].sum().reset_index() \
+            .sort_values("Toneladas", ascending=False)
+
+    if "Material" in micro.columns:
+        res["materiales"] = _total("Material")
+
+    if "Origen" in micro.columns:
+        if "CiudadOrigen" in micro.columns:
+            origenes = _total(["Origen", "CiudadOrigen"], dropna=False)
+            origenes["Origen"] = [f"{_etiqueta(o)} [{_etiqueta(c)}]"
+                                  for o, c in zip(origenes["Origen"], origenes["CiudadOrigen"])]
+            res["origenes"] = origenes.groupby("Origen")["Toneladas"].sum().reset_index() \
+                .sort_values("Toneladas", ascending=False)
+        else:
+            res["origenes"] = _total("Origen")
+
+    if "CentroLogistico" in micro.columns:
+        res["centros"] = _total("CentroLogistico")
+
+    if "Placa" in micro.columns:
+        res["vehiculos"] = (micro.groupby("Placa", observed=True)
+                            .agg(Viajes=("Viajes", "sum"), Toneladas=("Toneladas", "sum"))
+                            .reset_index().sort_values("Viajes", ascending=False))
+
+    if "Dia" in micro.columns:
+        evolucion = micro.groupby("Dia")["Toneladas"].sum().reset_index()
+        evolucion["Dia"] = evolucion["Dia"].dt.date
+        res["evolucion"] = evolucion.rename(columns={"Dia": "Fecha"})
+
+    return res
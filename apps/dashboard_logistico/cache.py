@@ -0,0 +1,60 @@
+# apps/dashboard_logistico/cache.py
+
+from app.cache import LRUCache, cache_key
+from config import Config
+from .data import ttl_dia, parse_dia
+from .cubo import leer_cubo
+from .columnar import serializar, deserializar
+from .agregaciones import a_categoricas, agregar
+
+# DataFrames (leídos del cubo diario) compartidos por todos los callbacks del proceso,
+# guardados en Arrow IPC (textos como diccionario → vuelven como `category`).
+# Los dcc.Store solo guardan los parámetros de la consulta; la clave se deriva
+# de ellos, así que cualquier worker puede reconstruir un frame que no tenga.
+# Incluyen la `version` del cubo que dejó load_data: después de cada recarga en segundo
+# plano las claves cambian y no se sirve el frame anterior.
+frames = LRUCache(maxsize=Config.DASHBOARD_CACHE_MAX)
+
+
+def _ttl(consulta):
+    # solo libera memoria: volver a leer el cubo es barato y nunca llama al SP
+    hasta = parse_dia(consulta.get("hasta"))
+    return ttl_dia(hasta) if hasta else Config.LOGISTICO_TTL_HOY
+
+
+def df_completo(consulta):
+    """
+    Datos del cubo para los parámetros de `consulta` (mismas claves que fetch_logistico).
+    Solo lee el cubo local: el SP lo consulta únicamente load_data, en segundo plano.
+    """
+    key = cache_key("completo", consulta)
+    data = frames.get_or_set(key, lambda: serializar(a_categoricas(leer_cubo(consulta))), ttl=_ttl(consulta))
+    return deserializar(data, categorias=True)
+
+
+def df_filtrado(filtro):
+    """
+    DataFrame completo filtrado por transportadoras / materiales.
+    `filtro` = {"consulta": {...}, "transportadoras": [...], "materiales": [...]}
+    """
+    if not filtro.get("transportadoras") and not filtro.get("materiales"):
+        return df_completo(filtro["consulta"])
+
+    def _filtrar():
+        df = df_completo(filtro["consulta"])
+        if filtro.get("transportadoras"):
+            df = df[df["NombreEmpresaTpte"].isin(filtro["transportadoras"])]
+        if filtro.get("materiales"):
+            df = df[df["Material"].isin(filtro["materiales"])]
+        return serializar(df)
+
+    key = cache_key("filtrado", filtro)
+    return deserializar(frames.get_or_set(key, _filtrar, ttl=_ttl(filtro["consulta"])), categorias=True)
+
+
+def agregados(filtro):
+    """
+    Resultado de `agregar` para el frame filtrado; cambiar el Top N no vuelve a agrupar.
+    """
+    key = cache_key("agregados", filtro)
+    return frames.get_or_set(key, lambda: agregar(df_filtrado(filtro)), ttl=_ttl(filtro["consulta"]))
@@ -0,0 +1,91 @@
+# apps/dashboard_logistico/columnar.py
+
+import json
+import pickle
+import pandas as pd
+import pyarrow as pa
+
+# Columnas de texto que se codificaron como diccionario (para poder devolverlas a object)
+_META_DICT = b"columnas_diccionario"
+# Índices de los diccionarios: fijos para que días con distinta cardinalidad (int8 vs int16)
+# se puedan concatenar sin promover tipos
+_INDICE_DICT = pa.int32()
+# Frames que Arrow no puede representar (p. ej. columnas object con tipos mezclados)
+_PREFIJO_PICKLE = b"PKL0"
+
+
+def _indices_fijos(tabla):
+    """
+    Castea toda columna diccionario a índices _INDICE_DICT (pandas elige int8/int16/… según
+    la cantidad de categorías de cada frame).
+    """
+    schema = tabla.schema
+    for i, campo in enumerate(schema):
+        if pa.types.is_dictionary(campo.type) and campo.type.index_type != _INDICE_DICT:
+            tipo = pa.dictionary(_INDICE_DICT, campo.type.value_type, campo.type.ordered)
+            schema = schema.set(i, campo.with_type(tipo))
+    return tabla if schema.equals(tabla.schema) else tabla.cast(schema)
+
+
+def _a_tabla(df):
+    cols_dict = [c for c in df.columns
+                 if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) == "string"]
+    if cols_dict:
+        df = df.astype({c: "category" for c in cols_dict})
+    tabla = _indices_fijos(pa.Table.from_pandas(df, preserve_index=False))
+    meta = dict(tabla.schema.metadata or {})
+    meta[_META_DICT] = json.dumps(cols_dict).encode("utf-8")
+    return tabla.replace_schema_metadata(meta)
+
+
+def serializar(df):
+    """
+    DataFrame -> Arrow IPC (stream) comprimido con zstd y textos como diccionario.
+    Conserva los dtypes (fechas incluidas) al volver a pandas.
+    """
+    try:
+        tabla = _a_tabla(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return _PREFIJO_PICKLE + pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    sink = pa.BufferOutputStream()
+    opciones = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, tabla.schema, options=opciones) as writer:
+        writer.write_table(tabla)
+    return sink.getvalue().to_pybytes()
+
+
+def _cols_dict(tabla):
+    return json.loads((tabla.schema.metadata or {}).get(_META_DICT, b"[]"))
+
+
+def _a_pandas(tabla, categorias, cols_dict=None):
+    df = tabla.to_pandas()
+    if not categorias:
+        for c in (_cols_dict(tabla) if cols_dict is None else cols_dict):
+            df[c] = df[c].astype(object).where(df[c].notna(), None)
+    return df
+
+
+def deserializar(data, categorias=False):
+    """
+    Inverso de `serializar`. Con `categorias=True` los textos quedan como `category`;
+    si no, vuelven a object como salieron del SP.
+    """
+    if data.startswith(_PREFIJO_PICKLE):
+        return pickle.loads(data[len(_PREFIJO_PICKLE):])
+    return _a_pandas(pa.ipc.open_stream(data).read_all(), categorias)
+
+
+def concatenar(lista, categorias=False):
+    """
+    Concatena varios frames serializados directamente en Arrow y convierte a pandas una sola vez.
+    """
+    try:
+        if any(d.startswith(_PREFIJO_PICKLE) for d in lista):
+            raise pa.ArrowInvalid("frames en pickle")
+        tablas = [_indices_fijos(pa.ipc.open_stream(d).read_all()) for d in lista]
+        cols_dict = sorted({c for t in tablas for c in _cols_dict(t)})
+        return _a_pandas(pa.concat_tables(tablas, promote_options="permissive"), categorias, cols_dict)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pd.concat([deserializar(d, categorias) for d in lista], ignore_index=True)
@@ -0,0 +1,135 @@
+# apps/dashboard_logistico/cubo.py
+
+from datetime import datetime, time, timedelta
+import pandas as pd
+from sqlalchemy import select, delete, insert, func
+from app.extensions import db
+from app.models import CuboLogistico, CuboLogisticoDia
+from app.cache import cache_key
+from config import Config
+from .data import fetch_logistico, parse_dia, ttl_dia, tramos
+
+# Granularidad del cubo: día × estas dimensiones
+DIMENSIONES_CUBO = ["Tipo", "Origen", "CiudadOrigen", "CentroLogistico", "Material",
+                    "NombreEmpresaTpte", "Placa", "Proveedor"]
+MEDIDAS_CUBO = ["Toneladas", "NumViajes", "Registros"]
+
+# Máximo de días por llamada al SP al rellenar el cubo
+CUBO_TRAMO_DIAS = 31
+
+
+def _engine():
+    return db.engines["local"]
+
+
+def variante(consulta):
+    """
+    Los filtros del SP distintos a las fechas (tipo, transporte…) definen una variante del cubo.
+    """
+    return cache_key({k: v for k, v in consulta.items() if k not in ("desde", "hasta", "version")})
+
+
+def construir_filas(df):
+    """
+    Agrega las filas del SP a día × DIMENSIONES_CUBO. Devuelve una lista de dicts para insertar.
+    """
+    if df.empty or "Fecha" not in df.columns:
+        return []
+
+    base = pd.DataFrame(index=df.index)
+    base["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce", dayfirst=True).dt.date
+    for c in DIMENSIONES_CUBO:
+        base[c] = df[c].map(lambda v: None if pd.isna(v) else str(v)) if c in df.columns else None
+    base["Toneladas"] = pd.to_numeric(df["Toneladas"], errors="coerce").fillna(0) if "Toneladas" in df.columns else 0.0
+    base["NumViajes"] = pd.to_numeric(df["NumViajes"], errors="coerce").fillna(0) if "NumViajes" in df.columns else 1.0
+    base["Registros"] = 1
+    base = base.dropna(subset=["Fecha"])
+
+    cubo = base.groupby(["Fecha"] + DIMENSIONES_CUBO, dropna=False, sort=False)[MEDIDAS_CUBO].sum().reset_index()
+    cubo = cubo.astype(object).where(cubo.notna(), None)
+    return cubo.to_dict("records")
+
+
+def _vigente(dia, actualizado, ahora):
+    # un día refrescado con suficiente margen después de su cierre ya no cambia
+    cierre = datetime.combine(dia + timedelta(days=1), time.min)
+    if actualizado >= cierre + timedelta(seconds=Config.LOGISTICO_TTL_CERRADO):
+        return True
+    return (ahora - actualizado).total_seconds() < ttl_dia(dia)
+
+
+def actualizar_cubo(consulta, progreso=None):
+    """
+    Rellena en el cubo los días del rango que faltan o están vencidos (incremental).
+    `progreso(dias_listos, dias_pendientes)` se llama al inicio y después de cada tramo.
+    """
+    inicio, fin = parse_dia(consulta.get("desde")), parse_dia(consulta.get("hasta"))
+    var = variante(consulta)
+    ahora = datetime.now()
+    dias_t = CuboLogisticoDia.__table__
+
+    with _engine().connect() as conn:
+        cargados = conn.execute(
+            select(dias_t.c.Fecha, dias_t.c.actualizado)
+            .where(dias_t.c.variante == var, dias_t.c.Fecha.between(inicio, fin))
+        ).all()
+    vigentes = {f for f, act in cargados if _vigente(f, act, ahora)}
+    faltan = [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)
+              if inicio + timedelta(days=i) not in vigentes]
+
+    cubo_t = CuboLogistico.__table__
+    listos = 0
+    if progreso:
+        progreso(listos, len(faltan))
+    for t_inicio, t_fin in tramos(faltan, CUBO_TRAMO_DIAS):
+        df = fetch_logistico(**{**consulta, "desde": t_inicio.isoformat(), "hasta": t_fin.isoformat()})
+        filas = [{"variante": var, **f} for f in construir_filas(df)]
+        dias = [{"variante": var, "Fecha": t_inicio + timedelta(days=i), "actualizado": ahora}
+                for i in range((t_fin - t_inicio).days + 1)]
+
+        with _engine().begin() as conn:
+            conn.execute(delete(cubo_t).where(cubo_t.c.variante == var, cubo_t.c.Fecha.between(t_inicio, t_fin)))
+            if filas:
+                conn.execute(insert(cubo_t), filas)
+            conn.execute(delete(dias_t).where(dias_t.c.variante == var, dias_t.c.Fecha.between(t_inicio, t_fin)))
+            conn.execute(insert(dias_t), dias)
+
+        listos += len(dias)
+        if progreso:
+            progreso(listos, len(faltan))
+
+
+def version_cubo(consulta):
+    """
+    Última actualización del cubo en el rango de `consulta` (ISO) o None: cambia cada vez
+    que `actualizar_cubo` rellena algún día, así sirve para invalidar lo derivado del cubo.
+    """
+    inicio, fin = parse_dia(consulta.get("desde")), parse_dia(consulta.get("hasta"))
+    if inicio is None or fin is None:
+        return None
+    dias_t = CuboLogisticoDia.__table__
+    with _engine().connect() as conn:
+        ultima = conn.execute(
+            select(func.max(dias_t.c.actualizado))
+            .where(dias_t.c.variante == variante(consulta), dias_t.c.Fecha.between(inicio, fin))
+        ).scalar()
+    return ultima.isoformat() if ultima else None
+
+
+def leer_cubo(consulta):
+    """
+    Filas del cubo (día × dimensiones con Toneladas, NumViajes y Registros) para el rango.
+    Sin un rango de fechas válido devuelve un frame vacío con las mismas columnas.
+    """
+    inicio, fin = parse_dia(consulta.get("desde")), parse_dia(consulta.get("hasta"))
+    cols = ["Fecha"] + DIMENSIONES_CUBO + MEDIDAS_CUBO
+    if inicio is None or fin is None or inicio > fin:
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[ns]" if c == "Fecha" else object) for c in cols})
+    cubo_t = CuboLogistico.__table__
+    stmt = (select(*[cubo_t.c[c] for c in cols])
+            .where(cubo_t.c.variante == variante(consulta), cubo_t.c.Fecha.between(inicio, fin)))
+    with _engine().connect() as conn:
+        df = pd.read_sql(stmt, conn)
+    # datetime64 desde el origen: Arrow lo conserva y nadie vuelve a parsear fechas
+    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    return df
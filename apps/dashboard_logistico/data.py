@@ -1,16 +1,14 @@
 # apps/dashboard_logistico/data.py
 
+from datetime import date, timedelta
 import pandas as pd
-from sqlalchemy import text
-from app.extensions import db
+from app.cache import LRUCache, cache_key
+from app.singleflight import single_flight
+from app.procedimientos import ejecutar_sp, none_if_empty
+from config import Config
+from .columnar import serializar, deserializar, concatenar
 
-def fetch_logistico(tipo=None, desde=None, hasta=None, pedido=None, origen=None, destino=None, transportadora=None, material=None, placa=None, 
-    proveedor_mat=None, transporte=None):
-    """
-    Llama al stored procedure usp_GetInformeLogistico y devuelve un DataFrame.
-    Los parámetros pueden ser None o strings con listas separadas por comas.
-    """
-    sql = """
+SQL_LOGISTICO_DASH = """
     EXEC MESPesajeInteligenteDB.dbo.usp_GetInformeLogisticoDash
     @tipo=:tipo,
     @fecha_inicio=:fecha_inicio,
@@ -25,7 +23,96 @@ def fetch_logistico(tipo=None, desde=None, hasta=None, pedido=None, origen=None,
     @transporte=:transporte
     """
 
+# Resultado del SP partido por día: (filtros sin fechas, día) -> Arrow IPC del DataFrame de ese día
+particiones = LRUCache(maxsize=Config.LOGISTICO_DIAS_MAX)
+
+
+def parse_dia(valor):
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        return None
+
+
+def ttl_dia(dia):
+    """
+    Vigencia en cache de un día: los días cerrados casi no cambian, el día en curso sí.
+    """
+    return Config.LOGISTICO_TTL_CERRADO if dia < date.today() else Config.LOGISTICO_TTL_HOY
+
+
+def _ejecutar(params, cachear=False):
+    # los tramos ya quedan cacheados por día en `particiones`; solo se cachean en el
+    # servicio de SP las consultas que no se pueden partir
+    df = ejecutar_sp("logistico_dash", SQL_LOGISTICO_DASH, params, cachear=cachear).df()
+
+    # limpiar nombres de columnas (quitar espacios)
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+def tramos(dias, max_dias=None):
+    """
+    Agrupa una lista ordenada de días en tramos consecutivos [(inicio, fin), ...],
+    opcionalmente de máximo `max_dias` días cada uno.
+    """
+    res = []
+    for d in dias:
+        if (res and res[-1][1] + timedelta(days=1) == d
+                and (max_dias is None or (d - res[-1][0]).days < max_dias)):
+            res[-1][1] = d
+        else:
+            res.append([d, d])
+    return res
+
+
+def _partir_por_dia(df, inicio, fin):
+    """
+    Separa el resultado de un tramo en un DataFrame por día.
+    Devuelve None si alguna fila no tiene una Fecha válida dentro del tramo.
+    """
+    if df.empty:
+        return {inicio + timedelta(days=i): df for i in range((fin - inicio).days + 1)}
+    if "Fecha" not in df.columns:
+        return None
+    dias = pd.to_datetime(df["Fecha"], errors="coerce", dayfirst=True).dt.date
+    if dias.isna().any() or dias.min() < inicio or dias.max() > fin:
+        return None
+    grupos = {d: g for d, g in df.groupby(dias, sort=False)}
+    vacio = df.iloc[0:0]
+    return {inicio + timedelta(days=i): grupos.get(inicio + timedelta(days=i), vacio)
+            for i in range((fin - inicio).days + 1)}
+
+
+def _normalizar_llamada(params):
+    """
+    Clave de coalescencia de fetch_logistico: fechas como día ISO, vacíos como None y
+    listas separadas por comas sin espacios, sin repetidos y en orden.
+    """
+    res = {}
+    for k, v in params.items():
+        if k in ("desde", "hasta"):
+            dia = parse_dia(v)
+            res[k] = dia.isoformat() if dia else none_if_empty(v)
+        elif isinstance(v, str):
+            res[k] = ",".join(sorted({x.strip() for x in v.split(",") if x.strip()})) or None
+        else:
+            res[k] = none_if_empty(v)
+    return res
+
 
+@single_flight("logistico_dash", normalizar=_normalizar_llamada)
+def fetch_logistico(tipo=None, desde=None, hasta=None, pedido=None, origen=None, destino=None, transportadora=None, material=None, placa=None,
+    proveedor_mat=None, transporte=None):
+    """
+    Llama al stored procedure usp_GetInformeLogistico y devuelve un DataFrame.
+    Los parámetros pueden ser None o strings con listas separadas por comas.
+
+    El resultado se cachea por día: al mover el rango solo se consultan los días
+    que faltan y se concatenan con los ya cacheados.
+    """
     params = {
         "tipo": tipo,
         "fecha_inicio": desde,
@@ -40,11 +127,26 @@ def fetch_logistico(tipo=None, desde=None, hasta=None, pedido=None, origen=None,
         "transporte": transporte
     }
 
-    with db.engine.connect().execution_options(stream_results=True) as conn:
-        result = conn.execute(text(sql), params)
-        df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    inicio, fin = parse_dia(desde), parse_dia(hasta)
+    if inicio is None or fin is None or inicio > fin:
+        return _ejecutar(params, cachear=True)
 
-    # limpiar nombres de columnas (quitar espacios)
-    df.columns = [c.strip() for c in df.columns]
-    return df
+    filtros = {k: v for k, v in params.items() if k not in ("fecha_inicio", "fecha_fin")}
+    dias = [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+    partes = {d: particiones.get(cache_key(filtros, d.isoformat())) for d in dias}
+
+    for t_inicio, t_fin in tramos([d for d, p in partes.items() if p is None]):
+        df_tramo = _ejecutar({**params, "fecha_inicio": t_inicio.isoformat(), "fecha_fin": t_fin.isoformat()})
+        por_dia = _partir_por_dia(df_tramo, t_inicio, t_fin)
+        if por_dia is None:
+            # filas sin fecha reconocible: no se puede partir, se consulta el rango completo
+            return _ejecutar(params, cachear=True)
+        for d, parte in por_dia.items():
+            partes[d] = (len(parte), serializar(parte))
+            particiones.set(cache_key(filtros, d.isoformat()), partes[d], ttl=ttl_dia(d))
 
+    # cada partición es (n_filas, bytes): se concatenan en Arrow sin pasar por pandas
+    no_vacias = [data for n, data in partes.values() if n]
+    if not no_vacias:
+        return deserializar(next(iter(partes.values()))[1])
+    return concatenar(no_vacias)
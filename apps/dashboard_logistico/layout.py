@@ -1,7 +1,6 @@
 from datetime import date
 import calendar
 from dash import html, dcc
-import pandas as pd
 
 def build_layout():
     """
@@ -134,6 +133,12 @@ def build_layout():
 
         ], className="flex flex-wrap -mx-2 mb-8 bg-white p-4 rounded-xl shadow-md"),
 
+        # ⏳ Avance de la carga en segundo plano (visible solo mientras corre)
+        html.Div([
+            html.Progress(id="dash-progreso", value=0, max=1, className="w-full h-2"),
+            html.Span(id="dash-progreso-texto", className="text-sm text-slate-500")
+        ], id="dash-cargando", style={"display": "none"}, className="mb-6"),
+
         # 💎 KPIs con colores y diseño moderno
         html.Div([
             html.Div([
@@ -159,14 +164,8 @@ def build_layout():
             html.Div(dcc.Graph(id="graf-evolucion", className="rounded-xl shadow bg-white p-2"), className="w-full md:w-1/2 p-2")
         ], className="flex flex-wrap -mx-2"),
 
-       # store para datos
-        dcc.Store(
-            id="store-df",
-            data=pd.DataFrame().to_json(date_format="iso", orient="split")
-        ),
-        dcc.Store(
-            id="store-df-full",  # <-- nuevo store
-            data=pd.DataFrame().to_json(date_format="iso", orient="split")
-        ),
+       # stores con los parámetros de consulta/filtro (los DataFrames viven en cache del servidor)
+        dcc.Store(id="store-df"),
+        dcc.Store(id="store-df-full"),
         dcc.Interval(id="init-timer", interval=2000, n_intervals=0, max_intervals=1)
     ], className="container mx-auto p-4")
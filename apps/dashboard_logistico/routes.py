@@ -1,6 +1,8 @@
 from flask import redirect, url_for, request
 from flask_login import current_user
-from dash import Dash
+from dash import Dash, DiskcacheManager
+import diskcache
+from config import Config
 from .layout import build_layout
 from .callbacks import register_callbacks
 
@@ -8,6 +10,9 @@ def init_dash(server):
     """
     Monta el dashboard dentro de Flask embebido en base.html
     """
+    # Las cargas lentas del SP corren en procesos aparte y no bloquean el worker de gunicorn
+    background_manager = DiskcacheManager(diskcache.Cache(Config.DASH_CACHE_DIR))
+
     dash_app = Dash(
         __name__,
         server=server,
@@ -15,6 +20,7 @@ def init_dash(server):
         assets_folder="app/static",
         external_scripts=["https://cdn.tailwindcss.com"],
         suppress_callback_exceptions=True,
+        background_callback_manager=background_manager,
     )
 
     # Protege la ruta
@@ -0,0 +1,119 @@
+# apps/optimizacion_mezcla_carbon/entrada.py
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import pandas as pd
+from app.cache import LRUCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_NUMERICAS = ['Disponible', 'Precio', 'HT', 'CZ', 'MV', 'S', 'FSI']
+# subir si cambia la forma de leer el libro: invalida los .pkl ya guardados
+VERSION_FORMATO = 1
+
+# Libros ya leídos por hash de contenido (en memoria; respaldo en OPT_CACHE_DIR)
+entradas = LRUCache(maxsize=Config.OPT_ENTRADAS_MAX)
+
+_hashes = {}          # (ruta, mtime, tamaño) -> sha1 del contenido
+_hashes_lock = threading.Lock()
+
+
+def hash_archivo(ruta):
+    """
+    sha1 del contenido; se recalcula solo si el archivo cambió (mtime/tamaño).
+    """
+    st = os.stat(ruta)
+    key = (os.path.abspath(ruta), st.st_mtime_ns, st.st_size)
+    with _hashes_lock:
+        h = _hashes.get(key)
+    if h is None:
+        sha = hashlib.sha1()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(bloque)
+        h = sha.hexdigest()
+        with _hashes_lock:
+            if len(_hashes) > 256:
+                _hashes.clear()
+            _hashes[key] = h
+    return h
+
+
+def _parsear(ruta):
+    """
+    Lee el libro de entrada (openpyxl): tabla de proveedores, requerimiento total,
+    calidad esperada y límites por tipo.
+    """
+    hoja = pd.read_excel(ruta, sheet_name=0, header=None, engine='openpyxl')
+    df = hoja.iloc[2:, 0:13].copy()
+    df.columns = hoja.iloc[1, 0:13]
+    df = df[df['Disponible'].notnull() & df['Precio'].notnull()]
+    df[COLUMNAS_NUMERICAS] = df[COLUMNAS_NUMERICAS].apply(pd.to_numeric, errors='coerce')
+    df = df[df['Disponible'] > 0]
+    df = df.drop_duplicates(subset=['Mina', 'Tipo']).sort_values(['Mina', 'Tipo'])
+    df['Costo_CCB'] = df['Precio'] / ((1 - df['MV']) / (1 - 0.012))
+
+    requerimiento_total = float(hoja.iloc[2, 14])
+    calidad_esperada = hoja.iloc[2, 16:20]
+    calidad_esperada.index = hoja.iloc[1, 16:20]
+
+    limites = hoja.iloc[2:, 21:23].dropna()
+    limites.columns = hoja.iloc[1, 21:23]
+
+    return {
+        'df': df,
+        'requerimiento_total': requerimiento_total,
+        'calidad_esperada': calidad_esperada.to_dict(),
+        'limites': dict(zip(limites['TIPO'], limites['LIMITE'])),
+    }
+
+
+def _ruta_cache(h):
+    return os.path.join(Config.OPT_CACHE_DIR, f"{h}.v{VERSION_FORMATO}.pkl")
+
+
+def _guardar(h, entrada):
+    os.makedirs(Config.OPT_CACHE_DIR, exist_ok=True)
+    ruta = _ruta_cache(h)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(entrada, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, ruta)
+
+    # solo se conservan los libros más recientes
+    archivos = sorted((os.path.join(Config.OPT_CACHE_DIR, n) for n in os.listdir(Config.OPT_CACHE_DIR)
+                       if n.endswith(".pkl")), key=os.path.getmtime, reverse=True)
+    for viejo in archivos[Config.OPT_CACHE_ARCHIVOS:]:
+        try:
+            os.remove(viejo)
+        except OSError:
+            pass
+
+
+def leer_entrada(ruta):
+    """
+    Entrada del modelo para el libro en `ruta`: memoria → .pkl en disco → openpyxl.
+    El resultado es compartido: no modificar `df` en el lugar.
+    """
+    h = hash_archivo(ruta)
+
+    def cargar():
+        try:
+            with open(_ruta_cache(h), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Cache de entrada {h} ilegible, se vuelve a leer el libro: {e}")
+
+        entrada = dict(_parsear(ruta), hash=h)
+        try:
+            _guardar(h, entrada)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la cache de entrada {h}: {e}")
+        return entrada
+
+    return entradas.get_or_set(h, cargar)
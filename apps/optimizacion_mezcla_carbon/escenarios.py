@@ -0,0 +1,217 @@
+# apps/optimizacion_mezcla_carbon/escenarios.py
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from .entrada import hash_archivo, leer_entrada
+from .modelo import ESTADOS, SinSolucion, resolver
+
+logger = logging.getLogger(__name__)
+
+MODELOS = ('precio', 'costo_ccb')
+VERDADEROS = ('true', '1', 'si', 'sí', 'on')
+FALSOS = ('false', '0', 'no', 'off', '')
+
+# Columnas de la tabla comparativa, en orden
+COLUMNAS = ['escenario', 'limite', 'solo_mineros', 'modelo', 'estado', 'costo_total',
+            'costo_unitario_cbp', 'rendimiento', 'coque_bruto', 'toneladas', 'comercializadores',
+            'S', 'FSI', 'CZ', 'MV', 'proveedores', 'error']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool():
+    """
+    Pool de procesos (spawn: no hereda hilos ni conexiones del worker web). Cada proceso
+    importa primero `app` para que los blueprints carguen en el orden normal.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.OPT_PROCESOS,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=__import__, initargs=("app",))
+        return _pool
+
+
+def _descartar_pool(roto):
+    """
+    Un proceso hijo murió (p. ej. sin memoria): el pool queda inservible para siempre,
+    así que se descarta para que la siguiente llamada cree uno nuevo.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is roto:
+            _pool = None
+    roto.shutdown(wait=False, cancel_futures=True)
+
+
+def _booleano(valor):
+    if valor is None or isinstance(valor, bool) or (isinstance(valor, int) and valor in (0, 1)):
+        return bool(valor)
+    texto = valor.strip().lower() if isinstance(valor, str) else None
+    if texto in VERDADEROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise ValueError(f"Valor inválido para solo_mineros: {valor!r}")
+
+
+def _limite(valor):
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise ValueError(f"Límite inválido: {valor!r}")
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise ValueError(f"Límite inválido: {valor!r}")
+    if not 0 <= limite <= 100:
+        raise ValueError(f"Límite fuera de rango: {limite}")
+    return limite
+
+
+def _lista(datos, campo, defecto):
+    valor = datos.get(campo)
+    if valor is None or valor == []:
+        return defecto
+    if not isinstance(valor, list):
+        raise ValueError(f"'{campo}' debe ser una lista")
+    return valor
+
+
+def normalizar(datos):
+    """
+    Lista de escenarios {limite (0-100), solo_mineros, modelo} a partir de:
+      - {"escenarios": [{...}, ...]}, o
+      - una grilla {"limites": [...], "solo_mineros": [...], "modelos": [...]} (producto cartesiano).
+    ValueError si el cuerpo no tiene esa forma, no hay escenarios válidos o son demasiados.
+    """
+    if not isinstance(datos, dict):
+        raise ValueError("Se esperaba un objeto JSON")
+    if datos.get('escenarios'):
+        crudos = _lista(datos, 'escenarios', [])
+    else:
+        limites = _lista(datos, 'limites', [100])
+        mineros = datos.get('solo_mineros')
+        mineros = _lista(datos, 'solo_mineros', [False]) if isinstance(mineros, list) else [mineros]
+        modelos = _lista(datos, 'modelos', ['precio'])
+        if len(limites) * len(mineros) * len(modelos) > Config.OPT_ESCENARIOS_MAX:
+            raise ValueError(f"Máximo {Config.OPT_ESCENARIOS_MAX} escenarios por barrido")
+        crudos = [{'limite': l, 'solo_mineros': m, 'modelo': mo}
+                  for l, m, mo in itertools.product(limites, mineros, modelos)]
+
+    escenarios, vistos = [], set()
+    for e in crudos:
+        if not isinstance(e, dict):
+            raise ValueError(f"Escenario inválido: {e!r}")
+        limite = _limite(e.get('limite', 100))
+        modelo = e.get('modelo', 'precio')
+        if not isinstance(modelo, str) or modelo not in MODELOS:
+            raise ValueError(f"Modelo desconocido: {modelo}")
+        clave = (limite, _booleano(e.get('solo_mineros', False)), modelo)
+        if clave not in vistos:
+            vistos.add(clave)
+            escenarios.append(dict(zip(('limite', 'solo_mineros', 'modelo'), clave)))
+
+    if not escenarios:
+        raise ValueError("No se recibieron escenarios")
+    if len(escenarios) > Config.OPT_ESCENARIOS_MAX:
+        raise ValueError(f"Máximo {Config.OPT_ESCENARIOS_MAX} escenarios por barrido")
+    return escenarios
+
+
+def _resolver_escenario(ruta, escenario):
+    """
+    Corre en el proceso del pool: la entrada sale de su cache (memoria o .pkl en disco).
+    """
+    fila = dict(escenario, estado=None, error=None)
+    try:
+        r = resolver(leer_entrada(ruta), escenario['solo_mineros'], escenario['limite'] / 100,
+                     escenario['modelo'])
+    except SinSolucion as e:
+        # inviable, sin acotar…: no hay promedios que calcular
+        fila.update(estado=ESTADOS.get(e.estado, e.estado), error='Sin solución')
+        return fila
+    except Exception as e:
+        fila.update(estado='Error', error=str(e))
+        return fila
+
+    fila.update({
+        'estado': ESTADOS.get(r['estado'], r['estado']),
+        'costo_total': round(float(r['costo_total']), 2),
+        'costo_unitario_cbp': round(float(r['costo_unitario_cbp']), 2),
+        'rendimiento': round(float(r['rendimiento']) * 100, 2),
+        'coque_bruto': round(float(r['coque_bruto_producido']), 2),
+        'toneladas': round(float(r['total']), 2),
+        'comercializadores': round(float(r['comercializadores']) / r['total'] * 100, 2),
+        'S': round(float(r['s_prom']) * 100, 3),
+        'FSI': round(float(r['fsi_prom']), 2),
+        'CZ': round(float(r['cz_prom']) * 100, 3),
+        'MV': round(float(r['mv_prom']) * 100, 3),
+        'proveedores': int(r['df_sol']['Proveedor'].nunique()),
+    })
+    return fila
+
+
+def _enviar(escenarios, ruta, pendientes, filas, limite_tiempo):
+    """
+    Envía al pool los escenarios `pendientes` (índices) y llena `filas` con los que terminan
+    antes de `limite_tiempo`. Devuelve los índices que quedaron sin resolver porque el pool
+    se rompió (para reintentar) — los vencidos quedan como error.
+    """
+    pool = _obtener_pool()
+    try:
+        futuros = {i: pool.submit(_resolver_escenario, ruta, escenarios[i]) for i in pendientes}
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        return list(pendientes)
+
+    wait(futuros.values(), timeout=max(0, limite_tiempo - time.monotonic()))
+    rotos = []
+    for i, f in futuros.items():
+        if not f.done():
+            f.cancel()
+            filas[i] = dict(escenarios[i], estado='Error', error='Tiempo agotado')
+            continue
+        try:
+            filas[i] = f.result()
+        except BrokenProcessPool:
+            rotos.append(i)
+    if rotos:
+        logger.error(f"Pool de optimización roto; {len(rotos)} escenarios sin resolver")
+        _descartar_pool(pool)
+    return rotos
+
+
+def barrer(ruta, escenarios):
+    """
+    Resuelve todos los escenarios en paralelo y devuelve la tabla comparativa
+    (una fila por escenario, en el orden recibido).
+
+    Todo el barrido tiene OPT_ESCENARIOS_TIMEOUT segundos (menos que el timeout del worker
+    web): lo que no alcance sale como error. Si un proceso del pool muere, se crea un pool
+    nuevo y sus escenarios se reintentan una vez.
+    """
+    limite_tiempo = time.monotonic() + Config.OPT_ESCENARIOS_TIMEOUT
+    # se lee el libro una vez aquí: los procesos encuentran el .pkl y no abren el Excel
+    ruta = os.path.abspath(ruta)
+    leer_entrada(ruta)
+    logger.info(f"Barrido de {len(escenarios)} escenarios sobre {hash_archivo(ruta)[:10]}")
+
+    filas = [None] * len(escenarios)
+    pendientes = _enviar(escenarios, ruta, range(len(escenarios)), filas, limite_tiempo)
+    if pendientes:
+        pendientes = _enviar(escenarios, ruta, pendientes, filas, limite_tiempo)
+    for i in pendientes:
+        filas[i] = dict(escenarios[i], estado='Error', error='Falló el proceso de optimización')
+
+    tabla = []
+    for i, fila in enumerate(filas, 1):
+        fila['escenario'] = i
+        tabla.append({c: fila.get(c) for c in COLUMNAS})
+    return tabla
@@ -0,0 +1,168 @@
+# apps/optimizacion_mezcla_carbon/graficos.py
+import hashlib
+import io
+import logging
+import os
+import pickle
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+import seaborn as sns
+from app.cache import LRUCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+sns.set_theme(style="ticks")
+
+TIPOS = ('torta', 'barras')
+FORMATOS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Imágenes ya dibujadas por (hash de la solución, tipo, formato)
+imagenes = LRUCache(maxsize=Config.OPT_GRAFICOS_MAX)
+# Datos de los gráficos por hash de la solución
+datos = LRUCache(maxsize=Config.OPT_GRAFICOS_MAX)
+
+
+def _carpeta():
+    return os.path.join(Config.OPT_CACHE_DIR, "graficos")
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def _podar():
+    carpeta = _carpeta()
+    archivos = sorted((os.path.join(carpeta, n) for n in os.listdir(carpeta) if not n.endswith(".tmp")),
+                      key=os.path.getmtime, reverse=True)
+    for viejo in archivos[Config.OPT_GRAFICOS_ARCHIVOS:]:
+        try:
+            os.remove(viejo)
+        except OSError:
+            pass
+
+
+def _series(df_sol):
+    """
+    Lo único que necesitan los gráficos: toneladas por tipo y pivote mina x tipo ordenado.
+    """
+    tipo_cantidad = df_sol.groupby("Tipo")["Toneladas"].sum()
+    pivot_df = df_sol.pivot_table(index='Mina', columns='Tipo', values='Toneladas', aggfunc='sum', fill_value=0)
+    pivot_df['Total'] = pivot_df.sum(axis=1)
+    pivot_df = pivot_df.sort_values('Total', ascending=False)
+    return {'tipo_cantidad': tipo_cantidad, 'valores': pivot_df.drop(columns='Total')}
+
+
+def registrar(df_sol):
+    """
+    Guarda los datos de los gráficos de una solución y devuelve su hash. No dibuja nada:
+    las imágenes se generan al pedirlas (ver imagen()) y quedan en cache.
+    """
+    h = hashlib.sha1(df_sol.to_json(orient="split").encode("utf-8")).hexdigest()[:20]
+    if datos.get(h) is None:
+        series = _series(df_sol)
+        datos.set(h, series)
+        ruta = os.path.join(_carpeta(), f"{h}.pkl")
+        if not os.path.exists(ruta):
+            try:
+                _escribir(ruta, pickle.dumps(series, protocol=pickle.HIGHEST_PROTOCOL))
+                _podar()
+            except OSError as e:
+                logger.warning(f"No se pudieron guardar los datos del gráfico {h}: {e}")
+    return h
+
+
+def _datos(h):
+    series = datos.get(h)
+    if series is None:
+        try:
+            with open(os.path.join(_carpeta(), f"{h}.pkl"), "rb") as f:
+                series = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        datos.set(h, series)
+    return series
+
+
+def _torta(series, formato):
+    tipo_cantidad = series['tipo_cantidad']
+    colors = sns.color_palette("colorblind", n_colors=len(tipo_cantidad))
+    fig = Figure(figsize=(4, 4))
+    ax = fig.subplots()
+    ax.pie(tipo_cantidad, labels=tipo_cantidad.index, autopct='%1.1f%%', startangle=90, colors=colors, textprops={'fontsize': 8})
+    ax.axis('equal')
+    buf = io.BytesIO()
+    fig.savefig(buf, format=formato, bbox_inches='tight', transparent=True)
+    return buf.getvalue()
+
+
+def _barras(series, formato):
+    valores_df = series['valores']
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    bottom = [0] * len(valores_df)
+    palette = sns.color_palette("colorblind", n_colors=len(valores_df.columns))
+    x = range(len(valores_df))
+
+    for i, tipo in enumerate(valores_df.columns):
+        valores = valores_df[tipo].values
+        ax.bar(x, valores, bottom=bottom, label=tipo, color=palette[i], alpha=0.7)
+        bottom = [bottom[j] + valores[j] for j in range(len(valores))]
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(valores_df.index, rotation=45, ha='right', fontsize=8)
+    ax.set_ylabel("Toneladas")
+    ax.legend(title='Tipo', bbox_to_anchor=(1.01, 1), loc='upper left')
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format=formato, transparent=True)
+    return buf.getvalue()
+
+
+def imagen(h, tipo, formato='png'):
+    """
+    Bytes del gráfico `tipo` de la solución `h`: memoria → disco → se dibuja (Figure, sin pyplot).
+    None si la solución no está registrada.
+    """
+    key = (h, tipo, formato)
+    contenido = imagenes.get(key)
+    if contenido is not None:
+        return contenido
+
+    ruta = os.path.join(_carpeta(), f"{h}_{tipo}.{formato}")
+    try:
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+    except OSError:
+        series = _datos(h)
+        if series is None:
+            return None
+        contenido = (_torta if tipo == 'torta' else _barras)(series, formato)
+        try:
+            _escribir(ruta, contenido)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el gráfico {h}_{tipo}: {e}")
+    imagenes.set(key, contenido)
+    return contenido
+
+
+def especificacion(h):
+    """
+    Datos de los gráficos como JSON (para dibujarlos en el navegador), o None.
+    """
+    series = _datos(h)
+    if series is None:
+        return None
+    tipo_cantidad, valores = series['tipo_cantidad'], series['valores']
+    return {
+        'torta': {'etiquetas': [str(t) for t in tipo_cantidad.index],
+                  'valores': [float(v) for v in tipo_cantidad.values]},
+        'barras': {'minas': [str(m) for m in valores.index],
+                   'series': [{'tipo': str(t), 'valores': [float(v) for v in valores[t].values]}
+                              for t in valores.columns]},
+    }
@@ -0,0 +1,95 @@
+# apps/optimizacion_mezcla_carbon/modelo_lp.py
+import threading
+from collections import OrderedDict
+from pulp import LpMinimize, LpProblem, LpStatus, LpVariable, PULP_CBC_CMD, lpSum
+from app.cache import LRUCache
+from config import Config
+
+ATRIBUTOS = ['Costo_CCB', 'Precio', 'Disponible', 'HT', 'CZ', 'MV', 'S', 'FSI']
+
+# Modelos ya armados por (hash del libro, solo_mineros)
+modelos = LRUCache(maxsize=Config.OPT_MODELOS_MAX)
+
+
+class ModeloMezcla:
+    """
+    LP de compras de carbón armado una sola vez por entrada y conjunto de proveedores.
+    Entre corridas solo cambian el objetivo (precio / costo_ccb) y el lado derecho del
+    límite de comercializadores; el resto del modelo se reutiliza tal cual.
+
+    - Disponible va como cota superior de cada variable (no como restricción aparte).
+    - Los pares (mina, tipo) se agrupan por tipo al armar, no se recorren por cada tipo.
+    - Con CBC se envía la solución anterior como punto de partida (warmStart).
+    """
+
+    def __init__(self, entrada, solo_mineros):
+        df = entrada['df']
+        if solo_mineros:
+            df = df[df['Clasificación'] == 'Minero']
+        self.df = df
+        self.requerimiento_total = requerimiento_total = entrada['requerimiento_total']
+        calidad_esperada_dict = entrada['calidad_esperada']
+        limites_dict = entrada['limites']
+
+        self.pares = pares = list(OrderedDict.fromkeys(zip(df['Mina'], df['Tipo'])))
+        comercializadores = df[df['Clasificación'] == 'Comercializador']
+        self.pares_comercializadores = list(zip(comercializadores['Mina'], comercializadores['Tipo']))
+        self.datos = datos = {atr: {(p, t): row[atr] for p, t, row in zip(df['Mina'], df['Tipo'], df.to_dict('records'))} for atr in ATRIBUTOS}
+
+        por_tipo = OrderedDict()
+        for par in pares:
+            por_tipo.setdefault(par[1], []).append(par)
+
+        model = LpProblem("Optimizacion_Compras_Carbon", LpMinimize)
+        # mismos nombres que LpVariable.dicts("Pedido", pares): el orden de columnas no cambia
+        self.x = x = {par: LpVariable(f"Pedido_{par}", lowBound=0, upBound=datos['Disponible'][par], cat='Continuous')
+                      for par in pares}
+
+        self.objetivos = {
+            'precio': lpSum(x[par] * datos['Precio'][par] for par in pares),
+            'costo_ccb': lpSum(x[par] * datos['Costo_CCB'][par] for par in pares),
+        }
+        model.setObjective(self.objetivos['precio'])
+
+        total_pedido = lpSum(x[par] for par in pares)
+        model += (total_pedido == requerimiento_total, "requerimiento")
+
+        for i, (tipo, pares_tipo) in enumerate(por_tipo.items()):
+            limite = limites_dict.get(tipo, 1)
+            model += (lpSum(x[par] for par in pares_tipo) <= limite * requerimiento_total, f"tipo_{i}")
+
+        model += lpSum(x[par] * datos['S'][par] for par in pares) <= calidad_esperada_dict['S'] * total_pedido
+        model += lpSum(x[par] * datos['FSI'][par] for par in pares) >= calidad_esperada_dict['FSI'] * total_pedido
+        model += lpSum(x[par] * datos['CZ'][par] for par in pares) <= calidad_esperada_dict['CZ'] * total_pedido
+        model += lpSum(x[par] * datos['MV'][par] for par in pares) <= calidad_esperada_dict['MV'] * total_pedido
+
+        model += (lpSum(x[par] for par in self.pares_comercializadores) <= requerimiento_total, "comercializadores")
+
+        self.model = model
+        self._lock = threading.Lock()
+        self._resuelto = False
+
+    def resolver(self, limite_comercializadores, modelo='precio'):
+        """
+        Ajusta objetivo y límite de comercializadores, resuelve y devuelve
+        (estado, {par: toneladas > 0}). Si el estado no es 'Optimal' la solución va vacía:
+        las variables no tienen valor (varValue None).
+        """
+        with self._lock:
+            self.model.setObjective(self.objetivos['costo_ccb' if modelo == 'costo_ccb' else 'precio'])
+            self.model.constraints["comercializadores"].changeRHS(limite_comercializadores * self.requerimiento_total)
+
+            solver = PULP_CBC_CMD(warmStart=self._resuelto)
+            self.model.solve(solver if solver.available() else None)
+            estado = LpStatus[self.model.status]
+            if estado != 'Optimal':
+                return estado, {}
+            self._resuelto = True
+
+            solucion = {par: self.x[par].varValue for par in self.pares if self.x[par].varValue > 0}
+            return estado, solucion
+
+
+def obtener_modelo(entrada, solo_mineros):
+    return modelos.get_or_set((entrada['hash'], bool(solo_mineros)),
+                              lambda: ModeloMezcla(entrada, solo_mineros))
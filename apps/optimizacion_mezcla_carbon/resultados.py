@@ -0,0 +1,147 @@
+# apps/optimizacion_mezcla_carbon/resultados.py
+import logging
+import os
+import time
+import uuid
+import pandas as pd
+from app.cache import LRUCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AlmacenResultados:
+    """
+    Soluciones del optimizador por (usuario, corrida), para exportarlas sin volver a resolver.
+
+    - En memoria: LRU acotado (OPT_RESULTADOS_MAX) con vigencia OPT_RESULTADOS_TTL.
+    - En disco: cada corrida se guarda al momento en Parquet (pickle si las columnas no se
+      pueden convertir) en OPT_CACHE_DIR/resultados, así cualquier worker puede servirla.
+      Se conservan las últimas OPT_RESULTADOS_POR_USUARIO de cada usuario y vencen con el mismo
+      TTL; cada guardado poda la carpeta completa (todos los usuarios).
+    """
+
+    def __init__(self):
+        self._memoria = LRUCache(maxsize=Config.OPT_RESULTADOS_MAX, ttl=Config.OPT_RESULTADOS_TTL)
+
+    @property
+    def _carpeta(self):
+        return os.path.join(Config.OPT_CACHE_DIR, "resultados")
+
+    def _archivos(self):
+        try:
+            nombres = os.listdir(self._carpeta)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self._carpeta, n) for n in nombres]
+
+    @staticmethod
+    def _clave(nombre):
+        # "<usuario>_<run>.parquet[.tmp]" -> (usuario, run)
+        usuario, _, resto = nombre.rpartition("_")
+        return usuario, resto.split(".", 1)[0]
+
+    def _podar(self):
+        """
+        Borra, de todos los usuarios, los archivos vencidos (también .tmp que quedaron de una
+        escritura interrumpida) y los que exceden OPT_RESULTADOS_POR_USUARIO por usuario.
+        Lo borrado sale también de la memoria de este proceso.
+        """
+        ahora = time.time()
+        por_usuario = {}
+        borrar = []
+        for ruta in self._archivos():
+            try:
+                mtime = os.path.getmtime(ruta)
+            except OSError:
+                continue
+            if ahora - mtime > Config.OPT_RESULTADOS_TTL:
+                borrar.append(ruta)
+            elif not ruta.endswith(".tmp"):
+                por_usuario.setdefault(self._clave(os.path.basename(ruta))[0], []).append((mtime, ruta))
+        for archivos in por_usuario.values():
+            archivos.sort(reverse=True)
+            borrar.extend(ruta for _, ruta in archivos[Config.OPT_RESULTADOS_POR_USUARIO:])
+
+        for ruta in borrar:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            self._memoria.pop(self._clave(os.path.basename(ruta)))
+
+    @staticmethod
+    def _volcar(df, ruta, escribir):
+        tmp = f"{ruta}.tmp"
+        try:
+            escribir(df, tmp)
+            os.replace(tmp, ruta)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _escribir(self, base, df):
+        os.makedirs(self._carpeta, exist_ok=True)
+        try:
+            self._volcar(df, f"{base}.parquet", lambda d, r: d.to_parquet(r, index=False))
+        except Exception as e:
+            logger.info(f"Resultado no convertible a Parquet ({e}); se guarda como pickle")
+            self._volcar(df, f"{base}.pkl", lambda d, r: d.to_pickle(r))
+
+    def _en_disco(self, usuario_id, run_id):
+        base = os.path.join(self._carpeta, f"{usuario_id}_{run_id}")
+        return os.path.exists(f"{base}.parquet") or os.path.exists(f"{base}.pkl")
+
+    def guardar(self, usuario_id, df):
+        """
+        Guarda la solución de una corrida y devuelve su id.
+        """
+        run_id = uuid.uuid4().hex
+        usuario_id = str(usuario_id)
+        en_disco = False
+        try:
+            self._escribir(os.path.join(self._carpeta, f"{usuario_id}_{run_id}"), df)
+            en_disco = True
+            self._podar()
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en disco el resultado {run_id}: {e}")
+        self._memoria.set((usuario_id, run_id), (df, en_disco))
+        return run_id
+
+    def obtener(self, usuario_id, run_id):
+        """
+        DataFrame de la corrida `run_id` del usuario, o None si no existe o venció.
+        """
+        if not run_id or not all(c in "0123456789abcdef" for c in run_id):
+            return None
+        usuario_id = str(usuario_id)
+        entrada = self._memoria.get((usuario_id, run_id))
+        if entrada is not None:
+            df, en_disco = entrada
+            # si otro worker ya la podó del disco, tampoco se sirve desde esta memoria
+            if not en_disco or self._en_disco(usuario_id, run_id):
+                return df
+            self._memoria.pop((usuario_id, run_id))
+            return None
+
+        base = os.path.join(self._carpeta, f"{usuario_id}_{run_id}")
+        for ext, leer in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+            ruta = base + ext
+            try:
+                if time.time() - os.path.getmtime(ruta) > Config.OPT_RESULTADOS_TTL:
+                    return None
+                df = leer(ruta)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"Resultado {run_id} ilegible: {e}")
+                return None
+            self._memoria.set((usuario_id, run_id), (df, True))
+            return df
+        return None
+
+
+almacen = AlmacenResultados()
@@ -1,10 +1,13 @@
 # apps/optimizacion/routes.py
-from flask import Blueprint, render_template, request, send_file, session
+from flask import Blueprint, render_template, request, send_file, session, jsonify, current_app, abort
 from flask_login import login_required, current_user
-from .modelo import procesar_archivo  # ajusta import según tu estructura
+from .modelo import procesar_archivo, SinSolucion  # ajusta import según tu estructura
+from . import escenarios, graficos
+from .resultados import almacen
 import os
 import io
 import pandas as pd
+from app import exportar, trabajos
 
 optimizacion_bp = Blueprint(
     "optimizacion",
@@ -15,12 +18,10 @@ optimizacion_bp = Blueprint(
 
 UPLOAD_FOLDER = 'temp'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-global_df_sol = None
 
 @optimizacion_bp.route('/', methods=['GET', 'POST'])
 @login_required
 def index():
-    global global_df_sol
     if request.method == 'POST':
         if 'archivo' in request.files and request.files['archivo'].filename != '':
             archivo = request.files['archivo']
@@ -40,11 +41,17 @@ def index():
         limite = int(request.form['limite']) / 100
         modelo = request.form.get('modelo', 'precio')
 
-        resultados = procesar_archivo(filepath, solo_mineros, limite, modelo)
-        global_df_sol = resultados['df_sol'].copy()
+        try:
+            resultados = procesar_archivo(filepath, solo_mineros, limite, modelo)
+        except SinSolucion as e:
+            return f"⚠️ {e}. Revisa el límite de comercializadores y los datos del archivo.", 400
+        # la solución queda por usuario y corrida: las descargas no dependen del worker
+        run_id = almacen.guardar(current_user.id, resultados['df_sol'])
+        session['opt_run'] = run_id
         return render_template(
             'index.html',  # plantilla dentro de apps/optimizacion/templates/optimizar
             **resultados,
+            run_id=run_id,
             solo_mineros=solo_mineros,
             limite_comercializadores=int(request.form['limite'])
             
@@ -60,17 +67,81 @@ def index():
 @optimizacion_bp.route('/descargar_excel', endpoint='descargar_excel')
 @login_required
 def descargar_excel():
-    global global_df_sol
-    if global_df_sol is None:
+    # ?run=<id> de la corrida mostrada; si no viene, la última del usuario en esta sesión
+    df = almacen.obtener(current_user.id, request.args.get("run") or session.get('opt_run'))
+    if df is None:
         return "No hay resultados para exportar.", 400
 
-    output = io.BytesIO()
-    global_df_sol.to_excel(output, index=False)
-    output.seek(0)
+    return exportar.respuesta(df, "resultados_optimizacion", request.args.get("formato", "xlsx"))
 
-    return send_file(
-        output,
-        download_name="resultados_optimizacion.xlsx",
-        as_attachment=True,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+@optimizacion_bp.route('/descargar_excel/trabajo', methods=['POST'])
+@login_required
+def descargar_excel_trabajo():
+    """
+    Exportación de resultados en segundo plano (estado y descarga en /api/exportaciones/<id>).
+    """
+    df = almacen.obtener(current_user.id, request.args.get("run") or session.get('opt_run'))
+    if df is None:
+        return jsonify({"error": "No hay resultados para exportar."}), 400
+
+    t = trabajos.encolar(current_app._get_current_object(), "optimizacion", lambda: df,
+                         "resultados_optimizacion", usuario_id=current_user.id,
+                         formato=request.args.get("formato", "xlsx"))
+    return jsonify(t.to_dict()), 202
+
+@optimizacion_bp.route('/escenarios', methods=['POST'])
+@login_required
+def barrido_escenarios():
+    """
+    Resuelve una grilla de escenarios sobre el archivo cargado en la sesión, en paralelo.
+    Body JSON: {"limites": [0, 50, 100], "solo_mineros": [false, true], "modelos": ["precio", "costo_ccb"]}
+    o {"escenarios": [{"limite": 30, "solo_mineros": false, "modelo": "precio"}, ...]}.
+    Devuelve la tabla comparativa (JSON, o descarga con ?formato=xlsx|csv).
+    """
+    filepath = session.get('archivo_path')
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({"error": "Debes subir un archivo Excel antes de comparar escenarios."}), 400
+
+    try:
+        lista = escenarios.normalizar(request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    filas = escenarios.barrer(filepath, lista)
+
+    formato = request.args.get("formato")
+    if formato in exportar.FORMATOS:
+        return exportar.respuesta(pd.DataFrame(filas, columns=escenarios.COLUMNAS),
+                                  "escenarios_optimizacion", formato)
+
+    optimos = [f for f in filas if f['estado'] == 'Óptimo']
+    mejor = min(optimos, key=lambda f: f['costo_unitario_cbp'])['escenario'] if optimos else None
+    return jsonify({"columnas": escenarios.COLUMNAS, "escenarios": filas, "mejor": mejor})
+
+@optimizacion_bp.route('/grafico/<h>/<tipo>.<ext>')
+@login_required
+def grafico(h, tipo, ext):
+    """
+    Gráfico de una solución (torta | barras) en png o svg, o sus datos con /datos.json.
+    El contenido depende solo del hash: el navegador lo puede guardar sin revalidar.
+    """
+    if len(h) != 20 or not all(c in "0123456789abcdef" for c in h):
+        abort(404)
+    if tipo == 'datos' and ext == 'json':
+        spec = graficos.especificacion(h)
+        if spec is None:
+            abort(404)
+        resp = jsonify(spec)
+    elif tipo in graficos.TIPOS and ext in graficos.FORMATOS:
+        contenido = graficos.imagen(h, tipo, ext)
+        if contenido is None:
+            abort(404)
+        resp = current_app.response_class(contenido, mimetype=graficos.FORMATOS[ext])
+    else:
+        abort(404)
+
+    resp.set_etag(f"{h}-{tipo}-{ext}")
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 30 * 24 * 3600
+    resp.cache_control.immutable = True
+    return resp.make_conditional(request)
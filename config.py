@@ -12,7 +12,103 @@ class Config:
     PREFERRED_URL_SCHEME = "https"
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024
 
-    # Bind para SQLite offline
+    # Cantidad máxima de DataFrames que el dashboard mantiene en memoria por proceso
+    DASHBOARD_CACHE_MAX = int(os.getenv("DASHBOARD_CACHE_MAX", "16"))
+
+    # Cache por día de usp_GetInformeLogisticoDash: días cerrados vs. día en curso (segundos)
+    LOGISTICO_DIAS_MAX = int(os.getenv("LOGISTICO_DIAS_MAX", "5000"))
+    LOGISTICO_TTL_CERRADO = int(os.getenv("LOGISTICO_TTL_CERRADO", str(12 * 3600)))
+    LOGISTICO_TTL_HOY = int(os.getenv("LOGISTICO_TTL_HOY", "120"))
+
+    # Coalescencia de llamadas idénticas entre workers: carpeta de locks/resultados y espera
+    # máxima por el líder antes de ejecutar por cuenta propia (segundos)
+    SINGLEFLIGHT_DIR = os.getenv("SINGLEFLIGHT_DIR", os.path.join(BASE_DIR, "temp", "singleflight"))
+    SINGLEFLIGHT_ESPERA = int(os.getenv("SINGLEFLIGHT_ESPERA", "60"))
+
+    # Cache en disco de los callbacks en segundo plano del dashboard (jobs y resultados)
+    DASH_CACHE_DIR = os.getenv("DASH_CACHE_DIR", os.path.join(BASE_DIR, "temp", "dash_cache"))
+
+    # Índice de valores de los filtros de los reportes: antigüedad a partir de la cual se recarga
+    # en segundo plano al pedirlo (segundos) y variantes (tipos) en memoria por proceso
+    FILTROS_REFRESCO = int(os.getenv("FILTROS_REFRESCO", "600"))
+    FILTROS_VARIANTES_MAX = int(os.getenv("FILTROS_VARIANTES_MAX", "8"))
+
+    # Filas por bloque al enviar en streaming los /data de los reportes
+    STREAM_FILAS = int(os.getenv("STREAM_FILAS", "2000"))
+
+    # Cache compartida de resultados de SP: entradas, vigencia si el rango incluye hoy / periodo cerrado
+    # (segundos) y máximo de filas de un resultado para guardarlo en cache
+    SP_CACHE_MAX = int(os.getenv("SP_CACHE_MAX", "32"))
+    SP_TTL_HOY = int(os.getenv("SP_TTL_HOY", "120"))
+    SP_TTL_CERRADO = int(os.getenv("SP_TTL_CERRADO", str(6 * 3600)))
+    SP_CACHE_FILAS_MAX = int(os.getenv("SP_CACHE_FILAS_MAX", "200000"))
+
+    # Paginación en servidor de los reportes: resultados por consulta en memoria, filas máximas de
+    # un resultado para guardarlo y tamaño de página
+    PAGINAS_CACHE_MAX = int(os.getenv("PAGINAS_CACHE_MAX", "8"))
+    PAGINAS_FILAS_MAX = int(os.getenv("PAGINAS_FILAS_MAX", "200000"))
+    PAGINAS_TTL = int(os.getenv("PAGINAS_TTL", "300"))
+    PAGINA_TAMANO = int(os.getenv("PAGINA_TAMANO", "50"))
+    PAGINA_TAMANO_MAX = int(os.getenv("PAGINA_TAMANO_MAX", "1000"))
+
+    # Índice de búsqueda de empleados: cada cuánto se revisa el token de cambios de GH_Empleados
+    # y recarga forzada si el token no se puede leer (segundos)
+    EMPLEADOS_TOKEN_SEG = int(os.getenv("EMPLEADOS_TOKEN_SEG", "30"))
+    EMPLEADOS_TTL = int(os.getenv("EMPLEADOS_TTL", "900"))
+
+    # Catálogo de destajos en memoria: cada cuánto se revisa el token de cambios de GH_Destajos
+    # y recarga forzada si el token no se puede leer (segundos)
+    DESTAJOS_TOKEN_SEG = int(os.getenv("DESTAJOS_TOKEN_SEG", "300"))
+    DESTAJOS_TTL = int(os.getenv("DESTAJOS_TTL", "3600"))
+
+    # Exportaciones en segundo plano: hilos por proceso, carpeta de archivos y vigencia (segundos)
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(BASE_DIR, "temp", "exports"))
+    EXPORT_TTL = int(os.getenv("EXPORT_TTL", "3600"))
+
+    # Sincronización por diferencias de los catálogos offline: vigencia del estado en memoria
+    # (segundos), carpeta de snapshots y cuántas versiones anteriores se conservan
+    SYNC_TTL = int(os.getenv("SYNC_TTL", "60"))
+    SYNC_DIR = os.getenv("SYNC_DIR", os.path.join(BASE_DIR, "temp", "sync"))
+    SYNC_VERSIONES = int(os.getenv("SYNC_VERSIONES", "20"))
+
+    # Respuestas condicionales (ETag/304) de la API: cuerpos serializados en memoria de catálogos
+    # completos/deltas y de consultas con filtros (typeahead, páginas), y vigencia (segundos)
+    CONDICIONAL_CACHE_MAX = int(os.getenv("CONDICIONAL_CACHE_MAX", "16"))
+    CONDICIONAL_CONSULTAS_MAX = int(os.getenv("CONDICIONAL_CONSULTAS_MAX", "256"))
+    CONDICIONAL_TTL = int(os.getenv("CONDICIONAL_TTL", "300"))
+
+    # Listado paginado de /api/registros: filas por página por defecto y máximo
+    REGISTROS_PAGINA = int(os.getenv("REGISTROS_PAGINA", "100"))
+    REGISTROS_PAGINA_MAX = int(os.getenv("REGISTROS_PAGINA_MAX", "1000"))
+
+    # Optimizador de mezcla de carbón: libros de entrada ya leídos en memoria, carpeta de la
+    # copia en disco (.pkl por hash de contenido) y cuántas copias se conservan
+    OPT_ENTRADAS_MAX = int(os.getenv("OPT_ENTRADAS_MAX", "8"))
+    OPT_CACHE_DIR = os.getenv("OPT_CACHE_DIR", os.path.join(BASE_DIR, "temp", "optimizacion"))
+    OPT_CACHE_ARCHIVOS = int(os.getenv("OPT_CACHE_ARCHIVOS", "50"))
+    # Modelos LP ya armados por (libro, solo_mineros) que se reutilizan entre corridas
+    OPT_MODELOS_MAX = int(os.getenv("OPT_MODELOS_MAX", "8"))
+    # Gráficos de resultados: imágenes/datos en memoria y archivos que se conservan en disco
+    OPT_GRAFICOS_MAX = int(os.getenv("OPT_GRAFICOS_MAX", "64"))
+    OPT_GRAFICOS_ARCHIVOS = int(os.getenv("OPT_GRAFICOS_ARCHIVOS", "300"))
+
+    # Resultados por usuario y corrida (descargas): entradas en memoria, vigencia (segundos)
+    # y corridas por usuario que se conservan en disco
+    OPT_RESULTADOS_MAX = int(os.getenv("OPT_RESULTADOS_MAX", "32"))
+    OPT_RESULTADOS_TTL = int(os.getenv("OPT_RESULTADOS_TTL", str(8 * 3600)))
+    OPT_RESULTADOS_POR_USUARIO = int(os.getenv("OPT_RESULTADOS_POR_USUARIO", "5"))
+
+    # Barrido de escenarios: procesos del pool, máximo de escenarios por llamada y tiempo
+    # máximo del barrido (segundos; por debajo del timeout de 30 s de gunicorn)
+    OPT_PROCESOS = int(os.getenv("OPT_PROCESOS", str(min(4, os.cpu_count() or 1))))
+    OPT_ESCENARIOS_MAX = int(os.getenv("OPT_ESCENARIOS_MAX", "60"))
+    OPT_ESCENARIOS_TIMEOUT = int(os.getenv("OPT_ESCENARIOS_TIMEOUT", "20"))
+
+    # Bind para SQLite offline (timeout: varios workers escriben el cubo del dashboard)
     SQLALCHEMY_BINDS = {
-    "local": f"sqlite:///{os.path.join(BASE_DIR, 'local.db')}"
+    "local": {
+        "url": f"sqlite:///{os.path.join(BASE_DIR, 'local.db')}",
+        "connect_args": {"timeout": 30}
+    }
 }
\ No newline at end of file
@@ -0,0 +1,19 @@
+-- sql/001_registros_destajo_indices.sql
+-- Índices del listado paginado de /api/registros (keyset por fecha, id descendente,
+-- con y sin filtro de documento). Los mismos que declara RegistroDestajo.__table_args__.
+-- Correr una vez en la base principal (SQL Server), fuera del horario de digitación:
+-- crear el índice bloquea registros_destajo mientras dura.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE name = 'ix_registros_destajo_fecha_id'
+                 AND object_id = OBJECT_ID('dbo.registros_destajo'))
+    CREATE INDEX ix_registros_destajo_fecha_id
+        ON dbo.registros_destajo (fecha, id);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE name = 'ix_registros_destajo_doc_fecha_id'
+                 AND object_id = OBJECT_ID('dbo.registros_destajo'))
+    CREATE INDEX ix_registros_destajo_doc_fecha_id
+        ON dbo.registros_destajo (empleado_documento, fecha, id);
+GO
@@ -0,0 +1,12 @@
+-- sql/002_registros_destajo_sync.sql
+-- Claves de idempotencia de /api/sync (modelo RegistroDestajoSync). Correr una vez en la
+-- base principal (SQL Server) antes de desplegar: la app ya no crea la tabla por su cuenta.
+
+IF OBJECT_ID('dbo.registros_destajo_sync', 'U') IS NULL
+    CREATE TABLE dbo.registros_destajo_sync (
+        clave        VARCHAR(64) NOT NULL PRIMARY KEY,
+        registro_id  INT         NOT NULL,
+        usuario_id   INT         NOT NULL,
+        creado       DATETIME    NOT NULL
+    );
+GO
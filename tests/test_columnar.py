@@ -0,0 +1,58 @@
+# tests/test_columnar.py
+"""
+Concatenación en Arrow de los frames por día del dashboard logístico (columnar.concatenar):
+días con distinta cantidad de categorías no deben caer al respaldo con pd.concat.
+"""
+from unittest import mock
+
+import pandas as pd
+import pyarrow as pa
+
+from apps.dashboard_logistico import columnar
+
+
+def _dia(n_placas, n_filas, fecha):
+    return pd.DataFrame({
+        "Fecha": pd.to_datetime([fecha] * n_filas),
+        "Placa": [f"P{i % n_placas:04d}" for i in range(n_filas)],
+        "Material": ["Carbón"] * n_filas,
+        "Toneladas": [float(i) for i in range(n_filas)],
+    })
+
+
+def _esperado(dias):
+    return pd.concat(dias, ignore_index=True)
+
+
+def test_dias_con_distinta_cardinalidad():
+    # 1000 placas -> índices int16; 3 placas -> int8
+    dias = [_dia(1000, 1500, "2026-01-01"), _dia(3, 10, "2026-01-02"), _dia(200, 300, "2026-01-03")]
+    datos = [columnar.serializar(d) for d in dias]
+
+    with mock.patch.object(columnar.pd, "concat", side_effect=AssertionError("respaldo pd.concat")):
+        out = columnar.concatenar(datos)
+
+    pd.testing.assert_frame_equal(out, _esperado(dias))
+
+
+def test_dias_con_distinta_cardinalidad_como_categorias():
+    dias = [_dia(1000, 1500, "2026-01-01"), _dia(3, 10, "2026-01-02")]
+    datos = [columnar.serializar(d) for d in dias]
+
+    with mock.patch.object(columnar.pd, "concat", side_effect=AssertionError("respaldo pd.concat")):
+        out = columnar.concatenar(datos, categorias=True)
+
+    assert isinstance(out["Placa"].dtype, pd.CategoricalDtype)
+    assert out["Placa"].astype(str).tolist() == _esperado(dias)["Placa"].tolist()
+    assert out["Toneladas"].tolist() == _esperado(dias)["Toneladas"].tolist()
+
+
+def test_indices_del_diccionario_fijos():
+    for n in (3, 1000):
+        tabla = pa.ipc.open_stream(columnar.serializar(_dia(n, n, "2026-01-01"))).read_all()
+        assert tabla.schema.field("Placa").type.index_type == pa.int32()
+
+
+def test_ida_y_vuelta():
+    df = _dia(5, 20, "2026-01-01")
+    pd.testing.assert_frame_equal(columnar.deserializar(columnar.serializar(df)), df)
@@ -0,0 +1,176 @@
+# tests/test_liquidacion.py
+"""
+Regresión de app/liquidacion.calcular contra el cálculo fila a fila que vivía en
+api.liquidacion_excel (calc_valor_total + .apply). Ambos se corren sobre el mismo
+DataFrame y el resultado debe ser idéntico.
+"""
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.liquidacion import COLUMNAS, COLUMNAS_VACIAS, SMV_DEFECTO, calcular
+
+
+def calcular_anterior(df, SMV=SMV_DEFECTO, f2=None):
+    """Copia de la lógica original (fila a fila) de liquidacion_excel."""
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    df = df.copy()
+    df['Cantidad'] = pd.to_numeric(df['Cantidad'], errors='coerce').fillna(0)
+    df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
+
+    df_group = df.groupby(
+        ['TipoDocumento','NumeroDocumento','Concepto','AreaFuncional'],
+        as_index=False
+    ).agg({'Cantidad':'sum','Valor':'mean'})
+
+    df_validos = df[~df['Concepto'].str.contains('DESCANSO|JORNAL', case=False, regex=True)].copy()
+    df_validos['vxq'] = df_validos['Valor']*df_validos['Cantidad']
+    ponderado = df_validos.groupby('NumeroDocumento').agg(
+        total_val=('vxq','sum'), conteo=('vxq','count')
+    )
+    ponderado['PromPond'] = ponderado['total_val']/ponderado['conteo']
+    ponderado['PromPond'] = ponderado['PromPond'].apply(lambda x: max(x,SMV))
+    prom_map = ponderado['PromPond'].to_dict()
+
+    def calc_valor_total(row):
+        concepto = (row.get('Concepto') or '').upper()
+        qty = float(row.get('Cantidad',0))
+        numdoc = row.get('NumeroDocumento')
+        if 'JORNAL FESTIVO' in concepto:
+            return SMV * 1.8 * qty
+        if 'JORNAL' in concepto:
+            return SMV * qty
+        if 'DESCANSO' in concepto:
+            prom = prom_map.get(numdoc, SMV)
+            return prom * qty
+        return ""
+
+    df_group['ValorTotal'] = df_group.apply(calc_valor_total, axis=1)
+    df_group['TipoNovedad'] = df_group['Concepto'].str.contains(
+        'DESCANSO|JORNAL', case=False, regex=True).map(lambda x: 4 if x else 3)
+    df_group['TipoRegistro'] = 1
+    df_group['TipoReporte'] = 5
+    df_group['FechaNovedad'] = f2 if f2 else ""
+    df_group['IncluyePago'] = df_group['TipoNovedad'].apply(lambda x: 'Y' if x == 4 else '')
+    df_group['SumaResta']   = df_group['TipoNovedad'].apply(lambda x: 1 if x == 4 else '')
+
+    for c in COLUMNAS_VACIAS:
+        df_group[c] = ""
+
+    df_group['ValorTotal'] = pd.to_numeric(df_group['ValorTotal'], errors='coerce').round(2)
+    df_group['Cantidad']   = pd.to_numeric(df_group['Cantidad'], errors='coerce').round(2)
+
+    return df_group[COLUMNAS]
+
+
+def _fila(doc, concepto, cantidad, valor, tipo='C', area='CC-100'):
+    return {'TipoDocumento': tipo, 'NumeroDocumento': doc, 'Concepto': concepto,
+            'AreaFuncional': area, 'Cantidad': cantidad, 'Valor': valor}
+
+
+@pytest.fixture
+def registros():
+    filas = [
+        # empleado con destajos normales (promedio ponderado por encima del SMV)
+        _fila('100', 'Corte de caña', Decimal('12.50'), Decimal('6000')),
+        _fila('100', 'Corte de caña', Decimal('3.25'), Decimal('6000')),
+        _fila('100', 'Cargue', Decimal('40'), Decimal('2500.75')),
+        _fila('100', 'Descanso remunerado', Decimal('1'), 0),
+        _fila('100', 'Jornal', Decimal('2'), 0),
+        _fila('100', 'JORNAL FESTIVO', Decimal('1'), 0),
+        # promedio ponderado por debajo del SMV -> se usa el SMV como piso
+        _fila('200', 'Empaque', Decimal('1'), Decimal('100')),
+        _fila('200', 'DESCANSO', Decimal('1'), 0),
+        _fila('200', 'jornal festivo', Decimal('0.5'), 0),
+        # solo conceptos especiales: DESCANSO sin promedio -> SMV
+        _fila('300', 'descanso', Decimal('2'), None, tipo='E', area='CC-200'),
+        _fila('300', 'Jornal', None, None, tipo='E', area='CC-200'),
+        # NULL en Valor/Cantidad y tipos mezclados (float/int/str)
+        _fila('400', 'Empaque', None, Decimal('3200')),
+        _fila('400', 'Empaque', 4, None),
+        _fila('400', 'Cargue', 2.5, '2500.75'),
+        _fila('400', 'Descanso', '1', 0, tipo='PT'),
+        _fila('400', 'Otro concepto', 'x', 'y'),
+    ]
+    return pd.DataFrame(filas)
+
+
+def _comparar(df, **kwargs):
+    smv = kwargs.get('smv', SMV_DEFECTO)
+    f2 = kwargs.get('fecha_novedad') or None
+    esperado = calcular_anterior(df, SMV=smv, f2=f2)
+    obtenido = calcular(df, **kwargs)
+    pd.testing.assert_frame_equal(
+        obtenido.reset_index(drop=True), esperado.reset_index(drop=True),
+        check_dtype=False,
+    )
+    return obtenido
+
+
+def test_igual_a_la_version_fila_a_fila(registros):
+    _comparar(registros, fecha_novedad="2026-01-31")
+
+
+def test_igual_con_otro_smv(registros):
+    _comparar(registros, smv=60000)
+
+
+def test_ramas_de_valor_total(registros):
+    out = _comparar(registros).set_index(['NumeroDocumento', 'Concepto'])
+    smv = SMV_DEFECTO
+    assert out.loc[('100', 'JORNAL FESTIVO'), 'ValorTotal'] == round(smv * 1.8, 2)
+    assert out.loc[('100', 'Jornal'), 'ValorTotal'] == smv * 2
+    assert out.loc[('200', 'jornal festivo'), 'ValorTotal'] == round(smv * 1.8 * 0.5, 2)
+    assert np.isnan(out.loc[('100', 'Cargue'), 'ValorTotal'])
+
+    # DESCANSO: promedio ponderado de los conceptos normales del empleado
+    prom_100 = (12.5 * 6000 + 3.25 * 6000 + 40 * 2500.75) / 3
+    assert out.loc[('100', 'Descanso remunerado'), 'ValorTotal'] == round(prom_100, 2)
+    # piso en el SMV, y SMV si el empleado no tiene conceptos normales
+    assert out.loc[('200', 'DESCANSO'), 'ValorTotal'] == smv
+    assert out.loc[('300', 'descanso'), 'ValorTotal'] == smv * 2
+
+
+def test_incluye_pago_y_suma_resta(registros):
+    out = _comparar(registros)
+    especial = out['Concepto'].str.contains('DESCANSO|JORNAL', case=False, regex=True)
+    assert (out.loc[especial, 'TipoNovedad'] == 4).all()
+    assert (out.loc[especial, 'IncluyePago'] == 'Y').all()
+    assert (out.loc[especial, 'SumaResta'] == 1).all()
+    assert (out.loc[~especial, 'TipoNovedad'] == 3).all()
+    assert (out.loc[~especial, 'IncluyePago'] == '').all()
+    assert (out.loc[~especial, 'SumaResta'] == '').all()
+
+
+def test_entrada_vacia():
+    out = calcular(pd.DataFrame())
+    assert out.empty
+    assert list(out.columns) == COLUMNAS
+    assert list(calcular_anterior(pd.DataFrame()).columns) == COLUMNAS
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_aleatorio(semilla):
+    rng = np.random.default_rng(semilla)
+    n = 2000
+    conceptos = np.array(['Corte', 'CARGUE', 'descanso', 'Descanso dominical', 'Jornal',
+                          'jornal festivo', 'Empaque', 'Riego'], dtype=object)
+    cantidades = [Decimal(str(round(x, 2))) for x in rng.uniform(0, 20, n)]
+    valores = [Decimal(int(x)) for x in rng.integers(0, 90000, n)]
+    for i in rng.choice(n, 50, replace=False):
+        cantidades[i] = None
+    for i in rng.choice(n, 50, replace=False):
+        valores[i] = None
+    df = pd.DataFrame({
+        'TipoDocumento': rng.choice(['C', 'E', 'PT'], n),
+        'NumeroDocumento': rng.integers(1, 80, n).astype(str),
+        'Concepto': rng.choice(conceptos, n),
+        'AreaFuncional': rng.choice(['CC-100', 'CC-200'], n),
+        'Cantidad': cantidades,
+        'Valor': valores,
+    })
+    _comparar(df, fecha_novedad="2026-02-28")